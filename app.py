@@ -3,11 +3,15 @@ Refaktoryzowana aplikacja Streamlit dla Normica.
 """
 import streamlit as st
 import os
+import uuid
 from typing import List, Dict, Any
 
 # Import z naszej biblioteki
 from src.config.settings import Config
 from src.chatbot.normica_bot import NormicaChatbot
+from src.utils.conversation_store import get_conversation_store
+from src.utils.corpus_registry import get_corpus_registry
+from src.utils.index_rebuilder import get_index_rebuilder
 
 
 def setup_page_config():
@@ -26,12 +30,45 @@ def setup_sidebar():
         
         # Sekcja bazy wektorowej
         st.subheader("Baza wektorowa")
-        if st.button("Przebuduj bazę wektorową", type="primary", key="rebuild_index"):
-            from src.utils.vector_store import VectorStoreManager
-            manager = VectorStoreManager()
-            manager.rebuild_index()
-            st.success("Baza wektorowa została przebudowana!")
+        registry = get_corpus_registry()
+        corpora = registry.available_corpora()
+        if not corpora:
+            st.info("Brak dokumentów do zindeksowania - sprawdź Config.CORPORA.")
+            return
+        
+        corpus_id = st.selectbox(
+            "Korpus",
+            options=list(corpora),
+            format_func=lambda cid: corpora[cid],
+            key="rebuild_corpus"
+        )
+        rebuilder = get_index_rebuilder()
+        if st.button("Przebuduj bazę wektorową", type="primary", key="rebuild_index",
+                     disabled=rebuilder.is_running(corpus_id)):
+            rebuilder.start(corpus_id)
             st.rerun()
+        
+        display_rebuild_status(rebuilder.status(corpus_id))
+
+
+def display_rebuild_status(status: Dict[str, Any]):
+    """Wyświetlenie stanu przebudowy bazy wektorowej."""
+    if status["state"] == "running":
+        st.progress(status["progress"], text=status["message"])
+        st.caption("Przebudowa trwa w tle - do jej zakończenia używana jest dotychczasowa baza.")
+        st.button("Odśwież status", key="refresh_rebuild_status")
+    elif status["state"] == "done":
+        st.success(f"Baza wektorowa została przebudowana! {status['message']}")
+    elif status["state"] == "error":
+        st.error(f"Błąd przebudowy bazy wektorowej: {status['error']}")
+    
+    if status["outdated"] and status["state"] != "running":
+        st.warning("Baza wektorowa ma nieaktualny format (brak grafu odwołań lub klauzul równoległych) - przebuduj ją.")
+    
+    if status["active_version"]:
+        st.caption(f"Aktywna wersja: {status['active_version']}")
+    elif status["state"] != "running":
+        st.caption("Baza wektorowa nie jest jeszcze zbudowana.")
 
 
 def display_header():
@@ -58,13 +95,45 @@ def initialize_session_state():
     if "chatbot" not in st.session_state:
         st.session_state.chatbot = NormicaChatbot()
         
-    if "messages" not in st.session_state:
-        st.session_state.messages = []
+    # Identyfikator rozmowy w adresie strony pozwala wrócić do niej po restarcie
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = st.query_params.get("session") or uuid.uuid4().hex
+        st.query_params["session"] = st.session_state.session_id
+        
+    if "older_messages" not in st.session_state:
+        reset_history_paging()
+
+
+def reset_history_paging():
+    """Wyzerowanie stronicowania historii (nowa rozmowa lub pierwsze wyświetlenie)."""
+    # Pierwsza tura bieżącego okna - ustalana przy pierwszym wyświetleniu rozmowy
+    st.session_state.history_start = None
+    # Starsze wiadomości wczytane przyciskiem, w kolejności chronologicznej
+    st.session_state.older_messages = []
 
 
 def display_chat_history():
-    """Wyświetlenie historii konwersacji."""
-    for message in st.session_state.messages:
+    """Wyświetlenie ostatnich wiadomości rozmowy; starsze są wczytywane stronami na żądanie."""
+    store = get_conversation_store()
+    session_id = st.session_state.session_id
+    total = store.count(session_id)
+    
+    # Tury są numerowane kolejno od 0, więc wiadomości od history_start to ostatnie wpisy rozmowy
+    if st.session_state.history_start is None:
+        st.session_state.history_start = max(total - Config.HISTORY_PAGE_SIZE, 0)
+    history_start = st.session_state.history_start
+    older_messages = st.session_state.older_messages
+    
+    oldest_turn = older_messages[0]["turn"] if older_messages else history_start
+    if oldest_turn > 0:
+        if st.button("Wczytaj starsze wiadomości", key="load_older_messages"):
+            st.session_state.older_messages = (
+                store.get_page(session_id, Config.HISTORY_PAGE_SIZE, before_turn=oldest_turn) + older_messages
+            )
+            st.rerun()
+    
+    messages = older_messages + store.get_page(session_id, max(total - history_start, 0))
+    for message in messages:
         with st.chat_message(message["role"]):
             st.write(message["content"])
 
@@ -78,6 +147,12 @@ def create_sidebar():
         Dzięki bazie wiedzy stworzonej z dokumentu normy, odpowiada na szczegółowe pytania dotyczące dostępności ICT.
         """)
         
+        if st.button("Nowa rozmowa", key="new_conversation"):
+            st.session_state.session_id = uuid.uuid4().hex
+            reset_history_paging()
+            st.query_params["session"] = st.session_state.session_id
+            st.rerun()
+        
         st.divider()
         
         st.write("© 2025 Normica")
@@ -86,21 +161,16 @@ def create_sidebar():
 def handle_user_input():
     """Obsługa wprowadzania tekstu przez użytkownika."""
     if prompt := st.chat_input("Zadaj pytanie o normę EN 301 549..."):
-        # Dodanie wiadomości użytkownika
-        st.session_state.messages.append({"role": "user", "content": prompt})
-        
         with st.chat_message("user"):
             st.write(prompt)
         
-        # Generowanie odpowiedzi
+        # Generowanie odpowiedzi (chatbot zapisuje obie wiadomości w magazynie rozmów)
         with st.spinner("Normica analizuje normę..."):
             response = st.session_state.chatbot.process_message(
-                st.session_state.messages, 
+                st.session_state.session_id, 
                 prompt
             )
             
-            st.session_state.messages.append(response)
-            
             with st.chat_message("assistant"):
                 st.write(response["content"])
 
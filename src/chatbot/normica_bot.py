@@ -1,39 +1,46 @@
 """
 Główna klasa chatbota Normica.
 """
-from typing import List, Dict, Any, Optional
-from langchain_openai import ChatOpenAI
+from typing import Dict, Any, Optional
+import openai
 from langchain_core.messages import HumanMessage, AIMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain.agents import create_openai_functions_agent, AgentExecutor
 import streamlit as st
 
 from ..config.settings import Config
-from ..utils.vector_store import VectorStoreManager
+from ..utils.conversation_store import ConversationStore, get_conversation_store
+from ..utils.corpus_registry import get_corpus_registry
+from ..utils.openai_clients import create_chat_model
 from .tools import font_size_calculator, get_current_date, create_norm_search_tool
 
 
 class NormicaChatbot:
     """Główna klasa chatbota Normica."""
     
-    def __init__(self, model_name: str = Config.DEFAULT_MODEL, temperature: float = Config.DEFAULT_TEMPERATURE):
+    def __init__(
+        self,
+        model_name: str = Config.DEFAULT_MODEL,
+        temperature: float = Config.DEFAULT_TEMPERATURE,
+        conversation_store: Optional[ConversationStore] = None
+    ):
         self.model_name = model_name
         self.temperature = temperature
-        self.llm = ChatOpenAI(model_name=model_name, temperature=temperature)
+        self.llm = create_chat_model(model_name, temperature)
         
-        # Inicjalizacja bazy wektorowej
-        self.vector_store_manager = VectorStoreManager()
+        # Rejestr korpusów - shardy są wspólne dla procesu i wczytywane leniwie
+        self.corpus_registry = get_corpus_registry()
+        
+        # Trwała historia rozmów
+        self.conversation_store = conversation_store or get_conversation_store()
         
         # Konfiguracja agenta
         self._setup_agent()
     
     def _setup_agent(self):
         """Konfiguracja agenta LangChain z narzędziami i RAG."""
-        # Pobranie retrievera
-        retriever = self.vector_store_manager.get_retriever()
-        
         # Utworzenie narzędzi
-        norm_search_tool = create_norm_search_tool(retriever)
+        norm_search_tool = create_norm_search_tool(self.corpus_registry)
         self.tools = [font_size_calculator, get_current_date, norm_search_tool]
         
         # Prompt systemowy
@@ -58,7 +65,11 @@ class NormicaChatbot:
     
     def _get_system_prompt(self) -> str:
         """Zwraca prompt systemowy dla agenta."""
-        return """
+        corpora = "\n".join(
+            f"        - `{corpus_id}`: {name}"
+            for corpus_id, name in self.corpus_registry.available_corpora().items()
+        )
+        return f"""
         Jesteś 'Normica', światowej klasy ekspertem od europejskiej normy EN 301 549 dotyczącej dostępności ICT.
         Twoim zadaniem jest odpowiadać na pytania użytkowników, bazując na dostarczonym kontekście z normy oraz używając dostępnych narzędzi.
 
@@ -66,6 +77,12 @@ class NormicaChatbot:
         - `font_size_calculator`: Użyj, gdy pytanie dotyczy obliczania wielkości czcionki.
         - `get_current_date`: Użyj, gdy pytanie dotyczy dzisiejszej daty.
         - `norm_search`: Użyj ZAWSZE, gdy pytanie dotyczy treści normy EN 301 549 (wymagań, definicji, procedur, itp.). To Twoje główne źródło wiedzy.
+          Argument `corpus` zawęża wyszukiwanie do wybranej normy; bez niego przeszukiwane są wszystkie.
+          Wymagania powtarzające się w rozdziałach 9 (Web), 10 (dokumenty) i 11 (oprogramowanie) są zwracane raz,
+          z listą `variant_clauses`; pełną treść wariantów uzyskasz, wywołując narzędzie z `include_variants=True`.
+
+        Dostępne korpusy (normy):
+{corpora}
 
         Kroki postępowania:
         1. Przeanalizuj pytanie użytkownika.
@@ -74,21 +91,28 @@ class NormicaChatbot:
         4. Jeśli pytanie dotyczy normy EN 301 549, ZAWSZE użyj narzędzia `norm_search`, aby znaleźć relevantne fragmenty.
         5. Na podstawie wyników z `norm_search`, sformułuj wyczerpującą i dokładną odpowiedź. Cytuj kluczowe informacje i, jeśli to możliwe, odnoś się do numerów klauzul.
         6. Jeśli `norm_search` nie zwróci wyników, poinformuj użytkownika, że nie możesz znaleźć odpowiedzi w dokumencie.
+           Jeśli wynik zawiera pole `status`, przekaż użytkownikowi jego `message` (np. że baza wiedzy jest jeszcze budowana).
         
         Odpowiadaj po polsku. Bądź precyzyjny, pomocny i trzymaj się faktów z dokumentu.
         """
     
-    def process_message(self, messages: List[Dict[str, Any]], user_input: str) -> Dict[str, Any]:
+    def process_message(self, session_id: str, user_input: str) -> Dict[str, Any]:
         """
         Przetwarzanie wiadomości użytkownika i generowanie odpowiedzi.
         
+        Agent otrzymuje ostatnie Config.HISTORY_WINDOW wiadomości z magazynu rozmów;
+        wiadomość użytkownika i odpowiedź są do niego dopisywane.
+        
         Args:
-            messages: Historia wiadomości
+            session_id: Identyfikator rozmowy w magazynie rozmów
             user_input: Wiadomość użytkownika
             
         Returns:
             Dict: Odpowiedź asystenta
         """
+        messages = self.conversation_store.get_page(session_id, Config.HISTORY_WINDOW)
+        self.conversation_store.append(session_id, "user", user_input)
+        
         # Konwersja historii na format LangChain
         chat_history = [
             HumanMessage(content=msg["content"]) if msg["role"] == "user" 
@@ -101,10 +125,18 @@ class NormicaChatbot:
                 "input": user_input,
                 "chat_history": chat_history
             })
-            return {"role": "assistant", "content": result["output"]}
+            response = {"role": "assistant", "content": result["output"]}
+        except openai.RateLimitError:
+            response = {
+                "role": "assistant",
+                "content": "Przepraszam, usługa OpenAI jest teraz przeciążona. Spróbuj ponownie za chwilę."
+            }
         except Exception as e:
             st.error(f"Wystąpił błąd agenta: {e}")
-            return {"role": "assistant", "content": f"Przepraszam, wystąpił błąd: {str(e)}"}
+            response = {"role": "assistant", "content": f"Przepraszam, wystąpił błąd: {str(e)}"}
+        
+        self.conversation_store.append(session_id, response["role"], response["content"])
+        return response
     
     def change_model(self, model_name: str, temperature: float = None):
         """
@@ -118,7 +150,7 @@ class NormicaChatbot:
         if temperature is not None:
             self.temperature = temperature
             
-        self.llm = ChatOpenAI(model_name=model_name, temperature=self.temperature)
+        self.llm = create_chat_model(model_name, self.temperature)
         self._setup_agent()
     
     def get_model_info(self) -> Dict[str, Any]:
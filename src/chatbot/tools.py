@@ -2,9 +2,19 @@
 Narzędzia dla chatbota Normica.
 """
 import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from langchain_core.tools import tool
 
+from ..utils.clause_alignment import expand_variants
+
+
+# Komunikaty dla korpusów bez opublikowanej wersji indeksu (patrz CorpusRegistry.pending_corpora)
+PENDING_CORPUS_MESSAGES = {
+    "building": "Baza wiedzy tego korpusu jest jeszcze budowana - spróbuj ponownie za kilka minut.",
+    "error": "Budowa bazy wiedzy tego korpusu nie powiodła się - przebuduj ją w panelu bocznym.",
+    "not_built": "Baza wiedzy tego korpusu nie jest zbudowana - wskaż korpus w argumencie corpus, aby ją zbudować."
+}
+
 
 @tool
 def font_size_calculator(distance: float) -> str:
@@ -38,29 +48,57 @@ def get_current_date() -> str:
     return datetime.date.today().strftime('%Y-%m-%d')
 
 
-def create_norm_search_tool(retriever):
+def create_norm_search_tool(registry):
     """
-    Tworzy narzędzie do wyszukiwania w normie EN 301 549.
+    Tworzy narzędzie do wyszukiwania w normach z rejestru korpusów.
     
     Args:
-        retriever: Retriever z bazy wektorowej
+        registry: Rejestr korpusów (CorpusRegistry)
         
     Returns:
         tool: Narzędzie do wyszukiwania w normie
     """
     @tool
-    def norm_search(query: str) -> List[Dict[str, Any]]:
+    def norm_search(query: str, corpus: Optional[str] = None, include_variants: bool = False) -> List[Dict[str, Any]]:
         """
-        Przeszukuje dokumentację normy EN 301 549 w poszukiwaniu odpowiedzi na pytanie użytkownika.
+        Przeszukuje dokumentację normy EN 301 549 (oraz innych zarejestrowanych norm) w poszukiwaniu odpowiedzi na pytanie użytkownika.
         Używaj tego narzędzia do odpowiadania na pytania dotyczące wymagań, definicji, klauzul i innych treści zawartych w normie.
         
         Args:
             query: Zapytanie do wyszukania w normie
+            corpus: Opcjonalny identyfikator korpusu (np. "en301549"); kilka oddziel przecinkami. Pominięcie przeszukuje wszystkie korpusy.
+            include_variants: Czy dołączyć pełną treść klauzul równoległych (np. 10.1.4.3 i 11.1.4.3 dla 9.1.4.3). Użyj, gdy pytanie dotyczy dokumentów lub oprogramowania, a wynik zawiera "variant_clauses".
             
         Returns:
-            List[Dict]: Lista znalezionych fragmentów dokumentu
+            List[Dict]: Lista znalezionych fragmentów dokumentu; "referenced_clauses" zawiera skróty klauzul, do których fragment się odwołuje.
+                Korpusy, których nie przeszukano, są zwracane z polami "status" i "message".
         """
-        docs = retriever.invoke(query)
-        return [{"page_content": doc.page_content} for doc in docs]
+        try:
+            pending = registry.pending_corpora(corpus)
+            results = registry.search(query, corpus=corpus)
+        except ValueError as e:
+            return [{"error": str(e)}]
+        
+        docs = [doc for doc, _score in results]
+        references = registry.expand_references(docs)
+        
+        found = []
+        for doc, doc_references in zip(docs, references):
+            result = {
+                "page_content": doc.page_content,
+                "corpus": doc.metadata.get("corpus"),
+                "clause": doc.metadata.get("clause_number")
+            }
+            if doc.metadata.get("variants"):
+                result["variant_clauses"] = list(doc.metadata["variants"])
+                if include_variants:
+                    result["variants"] = expand_variants(doc)
+            if doc_references:
+                result["referenced_clauses"] = doc_references
+            found.append(result)
+        
+        for corpus_id, state in pending.items():
+            found.append({"corpus": corpus_id, "status": state, "message": PENDING_CORPUS_MESSAGES[state]})
+        return found
     
     return norm_search
\ No newline at end of file
@@ -2,7 +2,7 @@
 Konfiguracja aplikacji Normica.
 """
 import os
-from typing import Dict, List
+from typing import Any, Dict, List
 
 import streamlit as st
 
@@ -10,9 +10,11 @@ import streamlit as st
 class Config:
     """Konfiguracja aplikacji."""
     
-    # OpenAI
-    # OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-    OPENAI_API_KEY = st.secrets["OPENAI_API_KEY"]
+    # OpenAI - klucz z st.secrets, a gdy ich brak, ze zmiennej środowiskowej
+    try:
+        OPENAI_API_KEY = st.secrets["OPENAI_API_KEY"]
+    except (FileNotFoundError, KeyError):
+        OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
     # Domyślne ustawienia
     DEFAULT_MODEL = "gpt-4o-mini"
@@ -22,11 +24,46 @@ class Config:
     NORM_FILE_PATH = "en301549.md"
     FAISS_INDEX_PATH = "faiss_index"
     LOGO_SVG_PATH = "normica_logo.svg"
+    CONVERSATION_DB_PATH = "normica_conversations.db"
+    
+    # Rejestr korpusów - każdy dokument ma własny shard indeksu w FAISS_INDEX_PATH/<id>.
+    # Dodanie nowej normy nie wymaga ponownego embeddingu pozostałych shardów.
+    # "parallel_chapters" - rozdziały z równoległymi klauzulami (9.x ↔ 10.x ↔ 11.x),
+    # których wspólna treść jest embedowana tylko raz.
+    DEFAULT_CORPUS = "en301549"
+    CORPORA: Dict[str, Dict[str, Any]] = {
+        "en301549": {"name": "EN 301 549", "path": NORM_FILE_PATH, "parallel_chapters": ["9", "10", "11"]},
+        # "en301549_pl": {"name": "EN 301 549 (PL)", "path": "en301549_pl.md"},
+        # "wcag21": {"name": "WCAG 2.1", "path": "wcag21.md"},
+        # "en17161": {"name": "EN 17161", "path": "en17161.md"},
+    }
+    
+    # Limity API OpenAI (wspólny harmonogram zapytań dla całego procesu)
+    OPENAI_REQUESTS_PER_MINUTE = 500
+    OPENAI_TOKENS_PER_MINUTE = 200_000
+    OPENAI_MAX_RETRIES = 5
+    OPENAI_RETRY_BASE_DELAY = 1.0
+    OPENAI_RETRY_MAX_DELAY = 30.0
+    OPENAI_MAX_CONNECTIONS = 20
     
     # Ustawienia RAG
+    # Wszystkie shardy muszą używać tego samego modelu, aby wyniki były porównywalne
+    EMBEDDING_MODEL = "text-embedding-ada-002"
+    EMBEDDING_BATCH_SIZE = 64
+    # Liczba wersji shardu zachowywanych na dysku (aktywna + poprzednie)
+    INDEX_VERSIONS_TO_KEEP = 2
     CHUNK_SIZE = 800
     CHUNK_OVERLAP = 128
     RETRIEVAL_K = 5
+    # Dołączanie klauzul, do których odwołują się wyniki (graf odwołań)
+    REFERENCE_TOKEN_BUDGET = 400
+    REFERENCE_DIGEST_TOKENS = 100
+    # Minimalne podobieństwo treści, przy którym klauzule równoległe są scalane
+    PARALLEL_CLAUSE_SIMILARITY = 0.7
+    
+    # Historia rozmowy
+    HISTORY_PAGE_SIZE = 20  # liczba wiadomości wyświetlanych na stronę
+    HISTORY_WINDOW = 10  # liczba ostatnich wiadomości przekazywanych agentowi
     
     # Ustawienia Streamlit
     PAGE_TITLE = "Normica - Asystent dla normy EN 301 549"
@@ -49,3 +86,16 @@ class Config:
             errors.append(f"Nie znaleziono pliku normy: {cls.NORM_FILE_PATH}")
             
         return errors
+    
+    @classmethod
+    def get_index_path(cls, corpus_id: str) -> str:
+        """
+        Zwraca ścieżkę shardu indeksu dla danego korpusu.
+        
+        Args:
+            corpus_id: Identyfikator korpusu z CORPORA
+            
+        Returns:
+            str: Ścieżka katalogu z indeksem FAISS
+        """
+        return os.path.join(cls.FAISS_INDEX_PATH, corpus_id)
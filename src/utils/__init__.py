@@ -4,7 +4,14 @@ Utils module for Normica - zawiera główne komponenty przetwarzania dokumentów
 
 # Główne komponenty używane przez aplikację
 from .advanced_chunking import chunk_markdown_by_header
-from .vector_store import VectorStoreManager
+from .vector_store import VectorStoreManager, IndexNotReadyError
+from .corpus_registry import CorpusRegistry, get_corpus_registry
+from .index_rebuilder import IndexRebuilder, get_index_rebuilder
+from .request_scheduler import RequestScheduler, get_request_scheduler
+from .openai_clients import create_chat_model, create_embeddings
+from .clause_graph import ClauseGraph
+from .clause_alignment import align_parallel_clauses
+from .conversation_store import ConversationStore, get_conversation_store
 
 # Opcjonalne narzędzia do analizy i optymalizacji (nie używane przez główną aplikację)
 # from .chunking_analyzer import ChunkingAnalyzer 
@@ -12,5 +19,18 @@ from .vector_store import VectorStoreManager
 
 __all__ = [
     "chunk_markdown_by_header",
-    "VectorStoreManager"
+    "VectorStoreManager",
+    "IndexNotReadyError",
+    "CorpusRegistry",
+    "get_corpus_registry",
+    "IndexRebuilder",
+    "get_index_rebuilder",
+    "RequestScheduler",
+    "get_request_scheduler",
+    "create_chat_model",
+    "create_embeddings",
+    "ClauseGraph",
+    "align_parallel_clauses",
+    "ConversationStore",
+    "get_conversation_store"
 ]
@@ -1,7 +1,18 @@
 import re
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from langchain_core.documents import Document
 
+CLAUSE_NUMBER_PATTERN = re.compile(r'^(\d+(?:\.\d+)*)\b')
+
+
+def extract_clause_number(header_text: Optional[str]) -> Optional[str]:
+    """Returns the clause number a header starts with (e.g. "9.1.4.3"), or None."""
+    if not header_text:
+        return None
+    match = CLAUSE_NUMBER_PATTERN.match(header_text.strip())
+    return match.group(1) if match else None
+
+
 def chunk_markdown_by_header(markdown_text: str) -> List[Document]:
     """Chunks markdown text based on headers H1-H4 using a custom implementation.
 
@@ -50,7 +61,8 @@ def chunk_markdown_by_header(markdown_text: str) -> List[Document]:
                     "H3": current_headers["H3"],
                     "H4": current_headers["H4"],
                     "header_level": current_header_level,
-                    "header_text": current_header_text
+                    "header_text": current_header_text,
+                    "clause_number": extract_clause_number(current_header_text)
                 }
                 # Usuwamy None z metadanych
                 metadata = {k: v for k, v in metadata.items() if v is not None}
@@ -91,7 +103,8 @@ def chunk_markdown_by_header(markdown_text: str) -> List[Document]:
             "H3": current_headers["H3"],
             "H4": current_headers["H4"],
             "header_level": current_header_level,
-            "header_text": current_header_text
+            "header_text": current_header_text,
+            "clause_number": extract_clause_number(current_header_text)
         }
         # Usuwamy None z metadanych
         metadata = {k: v for k, v in metadata.items() if v is not None}
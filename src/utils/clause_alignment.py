@@ -0,0 +1,150 @@
+"""
+Wykrywanie klauzul równoległych (np. 9.1.4.3 / 10.1.4.3 / 11.1.4.3) i kompresja ich treści.
+"""
+import difflib
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+from ..config.settings import Config
+
+
+# Różnica między treścią wariantu a treścią reprezentanta:
+# lista [i1, i2, linie] - linie reprezentanta [i1:i2] zastępowane podanymi liniami
+Delta = List[List[Any]]
+
+
+def compute_delta(base: str, variant: str) -> Delta:
+    """
+    Wyznacza różnicę liniową pozwalającą odtworzyć wariant z tekstu bazowego.
+    
+    Args:
+        base: Tekst reprezentanta
+        variant: Tekst wariantu
+    
+    Returns:
+        Delta: Lista zmian [i1, i2, linie]
+    """
+    base_lines = base.split("\n")
+    variant_lines = variant.split("\n")
+    matcher = difflib.SequenceMatcher(None, base_lines, variant_lines, autojunk=False)
+    return [
+        [i1, i2, variant_lines[j1:j2]]
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != "equal"
+    ]
+
+
+def apply_delta(base: str, delta: Delta) -> str:
+    """
+    Odtwarza tekst wariantu z tekstu bazowego i różnicy.
+    
+    Args:
+        base: Tekst reprezentanta
+        delta: Różnica wyznaczona przez compute_delta
+    
+    Returns:
+        str: Tekst wariantu
+    """
+    base_lines = base.split("\n")
+    lines: List[str] = []
+    position = 0
+    for i1, i2, replacement in delta:
+        lines.extend(base_lines[position:i1])
+        lines.extend(replacement)
+        position = i2
+    lines.extend(base_lines[position:])
+    return "\n".join(lines)
+
+
+def _similarity(base: str, variant: str, chapters: Sequence[str]) -> float:
+    """Podobieństwo treści na poziomie słów, z pominięciem numerów rozdziałów w numerach klauzul."""
+    chapter_pattern = re.compile(rf"\b(?:{'|'.join(map(re.escape, chapters))})\.(?=\d)")
+    base_words = chapter_pattern.sub("X.", base).split()
+    variant_words = chapter_pattern.sub("X.", variant).split()
+    return difflib.SequenceMatcher(None, base_words, variant_words, autojunk=False).ratio()
+
+
+def align_parallel_clauses(
+    docs: List[Document],
+    chapters: Sequence[str],
+    threshold: float = Config.PARALLEL_CLAUSE_SIMILARITY
+) -> Tuple[List[Document], Dict[str, str]]:
+    """
+    Łączy klauzule równoległe w rozdziałach `chapters` w jeden dokument z wariantami.
+    
+    Klauzule są równoległe, gdy mają ten sam numer poza numerem rozdziału
+    (9.1.4.3 ↔ 10.1.4.3 ↔ 11.1.4.3). Reprezentantem jest klauzula z pierwszego
+    rozdziału na liście; wariant podobny co najmniej w stopniu `threshold`
+    jest zapisywany w metadanych reprezentanta jako różnica ("variants")
+    i nie jest osobno embedowany.
+    
+    Args:
+        docs: Chunki z metadanymi clause_number
+        chapters: Numery rozdziałów z równoległymi klauzulami, np. ["9", "10", "11"]
+        threshold: Minimalne podobieństwo treści (0.0-1.0)
+    
+    Returns:
+        Tuple[List[Document], Dict[str, str]]: Dokumenty do embeddingu oraz mapa
+            aliasów (klauzula wariantu -> klauzula reprezentanta)
+    """
+    if len(chapters) < 2:
+        return docs, {}
+    
+    # Grupowanie po numerze klauzuli bez numeru rozdziału
+    groups: Dict[str, Dict[str, Document]] = {}
+    for doc in docs:
+        clause = doc.metadata.get("clause_number") or ""
+        chapter, _, suffix = clause.partition(".")
+        if chapter in chapters and suffix:
+            groups.setdefault(suffix, {})[chapter] = doc
+    
+    merged_ids = set()
+    aliases: Dict[str, str] = {}
+    for group in groups.values():
+        representative: Optional[Document] = next(
+            (group[chapter] for chapter in chapters if chapter in group), None
+        )
+        if representative is None or len(group) < 2:
+            continue
+        
+        variants: Dict[str, Dict[str, Any]] = {}
+        for chapter in chapters:
+            variant = group.get(chapter)
+            if variant is None or variant is representative:
+                continue
+            if _similarity(representative.page_content, variant.page_content, chapters) < threshold:
+                continue
+            clause = variant.metadata["clause_number"]
+            variants[clause] = {
+                "header_text": variant.metadata.get("header_text"),
+                "delta": compute_delta(representative.page_content, variant.page_content)
+            }
+            aliases[clause] = representative.metadata["clause_number"]
+            merged_ids.add(id(variant))
+        
+        if variants:
+            representative.metadata["variants"] = variants
+    
+    return [doc for doc in docs if id(doc) not in merged_ids], aliases
+
+
+def expand_variants(doc: Document) -> List[Dict[str, Any]]:
+    """
+    Odtwarza pełne treści wariantów zapisanych w metadanych reprezentanta.
+    
+    Args:
+        doc: Dokument reprezentanta
+    
+    Returns:
+        List[Dict]: Warianty (clause, header_text, page_content)
+    """
+    return [
+        {
+            "clause": clause,
+            "header_text": variant.get("header_text"),
+            "page_content": apply_delta(doc.page_content, variant["delta"])
+        }
+        for clause, variant in doc.metadata.get("variants", {}).items()
+    ]
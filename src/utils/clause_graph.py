@@ -0,0 +1,177 @@
+"""
+Graf odwołań między klauzulami normy ("see clause 9.1.4.3", "Table 10.1").
+"""
+import json
+import os
+import re
+from typing import Dict, List, Optional
+
+from langchain_core.documents import Document
+
+
+CLAUSE_GRAPH_FILE = "clause_graph.json"
+
+# Przybliżenie liczby tokenów, spójne z szacowaniem w RequestScheduler
+CHARS_PER_TOKEN = 4
+
+_NUMBER = r"\d+(?:\.\d+)*"
+# "clause 9.1", "clauses 7.1.1 and 7.1.2", "clauses 11.5.2.5 to 11.5.2.17" (zakres - tylko krańce)
+CLAUSE_REFERENCE_PATTERN = re.compile(
+    rf"\b[Cc]lauses?\s+({_NUMBER}(?:\s*(?:,|and|or|to)\s*(?:clause\s+)?{_NUMBER})*)"
+)
+TABLE_REFERENCE_PATTERN = re.compile(r"\bTable\s+([A-Z0-9]+(?:\.\d+)+)")
+TABLE_CAPTION_PATTERN = re.compile(r"^Table\s+([A-Z0-9]+(?:\.\d+)+)\s*:", re.MULTILINE)
+
+
+def extract_references(text: str) -> List[str]:
+    """
+    Wyodrębnia odwołania do klauzul i tabel z tekstu.
+    
+    Args:
+        text: Treść fragmentu normy
+    
+    Returns:
+        List[str]: Numery klauzul i identyfikatory tabel ("Table 10.1") w kolejności wystąpienia
+    """
+    references: List[str] = []
+    for match in CLAUSE_REFERENCE_PATTERN.finditer(text):
+        references.extend(re.findall(_NUMBER, match.group(1)))
+    for match in TABLE_REFERENCE_PATTERN.finditer(text):
+        references.append(f"Table {match.group(1)}")
+    return list(dict.fromkeys(references))
+
+
+def estimate_tokens(text: str) -> int:
+    """Szacuje liczbę tokenów tekstu."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class ClauseGraph:
+    """
+    Indeks sąsiedztwa klauzul: klauzula -> klauzule, do których się odwołuje.
+    
+    Odwołania do tabel są rozwiązywane na klauzulę zawierającą podpis tabeli.
+    Odwołania do klauzul spoza dokumentu (np. Section 508) są pomijane.
+    Mapa aliasów wskazuje, który reprezentant przechowuje treść klauzuli
+    równoległej (patrz align_parallel_clauses).
+    """
+    
+    def __init__(
+        self,
+        titles: Optional[Dict[str, str]] = None,
+        texts: Optional[Dict[str, str]] = None,
+        references: Optional[Dict[str, List[str]]] = None,
+        aliases: Optional[Dict[str, str]] = None
+    ):
+        self.titles = titles or {}
+        self.texts = texts or {}
+        self.references = references or {}
+        self.aliases = aliases or {}
+    
+    @classmethod
+    def from_documents(cls, docs: List[Document]) -> "ClauseGraph":
+        """
+        Buduje graf z chunków utworzonych przez chunk_markdown_by_header.
+        
+        Args:
+            docs: Chunki z metadanymi clause_number i header_text
+        
+        Returns:
+            ClauseGraph: Graf odwołań
+        """
+        titles: Dict[str, str] = {}
+        texts: Dict[str, str] = {}
+        table_clauses: Dict[str, str] = {}
+        for doc in docs:
+            clause = doc.metadata.get("clause_number")
+            if not clause:
+                continue
+            titles[clause] = doc.metadata.get("header_text", clause)
+            # Treść bez linii nagłówka
+            texts[clause] = doc.page_content.split("\n", 1)[1].strip() if "\n" in doc.page_content else ""
+            for table in TABLE_CAPTION_PATTERN.findall(doc.page_content):
+                table_clauses.setdefault(f"Table {table}", clause)
+        
+        references: Dict[str, List[str]] = {}
+        for clause, text in texts.items():
+            targets = []
+            for reference in extract_references(text):
+                target = table_clauses.get(reference, reference)
+                if target != clause and target in texts and target not in targets:
+                    targets.append(target)
+            if targets:
+                references[clause] = targets
+        
+        return cls(titles, texts, references)
+    
+    @classmethod
+    def load(cls, directory: str) -> "ClauseGraph":
+        """
+        Wczytuje graf zapisany obok indeksu.
+        
+        Wersje indeksu sprzed grafu go nie mają - wtedy zwracany jest pusty graf,
+        a VectorStoreManager.is_outdated zgłasza wersję do przebudowy.
+        """
+        path = os.path.join(directory, CLAUSE_GRAPH_FILE)
+        if not os.path.exists(path):
+            return cls()
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data.get("titles"), data.get("texts"), data.get("references"), data.get("aliases"))
+    
+    def save(self, directory: str) -> None:
+        """Zapisuje graf w katalogu wersji indeksu."""
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, CLAUSE_GRAPH_FILE), "w", encoding="utf-8") as f:
+            json.dump(
+                {"titles": self.titles, "texts": self.texts, "references": self.references, "aliases": self.aliases},
+                f,
+                ensure_ascii=False
+            )
+    
+    def merge_variant_references(self) -> None:
+        """
+        Dołącza odwołania klauzul wariantów do odwołań ich reprezentantów.
+        
+        Wariant nie ma własnego dokumentu w indeksie, więc jego odwołania są
+        rozwijane dla reprezentanta. Pomijane są odwołania, które po rozwiązaniu
+        aliasów wskazują na reprezentanta lub na klauzulę już obecną na liście
+        (np. "10.2.1" wariantu, gdy reprezentant odwołuje się do "9.2.1").
+        """
+        for variant, representative in self.aliases.items():
+            targets = list(self.references.get(representative, []))
+            canonical_targets = {self.canonical(target) for target in targets}
+            for target in self.references.get(variant, []):
+                canonical_target = self.canonical(target)
+                if canonical_target == representative or canonical_target in canonical_targets:
+                    continue
+                targets.append(target)
+                canonical_targets.add(canonical_target)
+            if targets:
+                self.references[representative] = targets
+    
+    def canonical(self, clause: str) -> str:
+        """Zwraca klauzulę reprezentanta, w której przechowywana jest treść klauzuli."""
+        return self.aliases.get(clause, clause)
+    
+    def references_of(self, clause: Optional[str]) -> List[str]:
+        """Zwraca klauzule, do których odwołuje się podana klauzula."""
+        return self.references.get(clause, []) if clause else []
+    
+    def digest(self, clause: str, max_tokens: int) -> str:
+        """
+        Zwraca skrót treści klauzuli mieszczący się w limicie tokenów.
+        
+        Args:
+            clause: Numer klauzuli
+            max_tokens: Maksymalna liczba tokenów skrótu
+        
+        Returns:
+            str: Skrót treści (pusty, jeśli klauzula nie istnieje lub limit jest zerowy)
+        """
+        text = " ".join(self.texts.get(clause, "").split())
+        max_chars = max_tokens * CHARS_PER_TOKEN
+        if len(text) <= max_chars:
+            return text
+        cut = text[:max_chars].rsplit(" ", 1)[0]
+        return f"{cut}…" if cut else ""
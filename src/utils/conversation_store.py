@@ -0,0 +1,126 @@
+"""
+Trwałe przechowywanie rozmów w lokalnej bazie SQLite.
+"""
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from ..config.settings import Config
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    session_id TEXT NOT NULL,
+    turn INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (session_id, turn)
+)
+"""
+
+
+class ConversationStore:
+    """
+    Magazyn wiadomości typu append-only, indeksowany sesją i numerem tury.
+    
+    Tury każdej sesji są numerowane kolejno od 0, bez luk.
+    
+    Każdy wątek korzysta z własnego połączenia SQLite; baza działa w trybie WAL,
+    więc odczyty nie blokują zapisów z innych sesji.
+    """
+    
+    def __init__(self, db_path: str = Config.CONVERSATION_DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        with self._connect() as connection:
+            connection.execute(SCHEMA)
+    
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=30)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+    
+    def append(self, session_id: str, role: str, content: str) -> int:
+        """
+        Dopisuje wiadomość na końcu rozmowy.
+        
+        Args:
+            session_id: Identyfikator sesji
+            role: Rola ("user" lub "assistant")
+            content: Treść wiadomości
+        
+        Returns:
+            int: Numer tury nadany wiadomości
+        """
+        connection = self._connect()
+        with connection:
+            # Blokada zapisu przed odczytem numeru tury, aby numery się nie powtarzały
+            connection.execute("BEGIN IMMEDIATE")
+            row = connection.execute(
+                "SELECT COALESCE(MAX(turn), -1) + 1 FROM messages WHERE session_id = ?",
+                (session_id,)
+            ).fetchone()
+            turn = row[0]
+            connection.execute(
+                "INSERT INTO messages (session_id, turn, role, content, created_at) VALUES (?, ?, ?, ?, ?)",
+                (session_id, turn, role, content, time.time())
+            )
+        return turn
+    
+    def count(self, session_id: str) -> int:
+        """Zwraca liczbę wiadomości w rozmowie."""
+        row = self._connect().execute(
+            "SELECT COUNT(*) FROM messages WHERE session_id = ?",
+            (session_id,)
+        ).fetchone()
+        return row[0]
+    
+    def get_page(self, session_id: str, limit: int, before_turn: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Zwraca stronę wiadomości kończącą się przed podaną turą.
+        
+        Args:
+            session_id: Identyfikator sesji
+            limit: Maksymalna liczba wiadomości
+            before_turn: Numer tury, przed którą kończy się strona; None oznacza najnowsze wiadomości
+        
+        Returns:
+            List[Dict]: Wiadomości (turn, role, content) w kolejności chronologicznej
+        """
+        if before_turn is None:
+            rows = self._connect().execute(
+                "SELECT turn, role, content FROM messages WHERE session_id = ? "
+                "ORDER BY turn DESC LIMIT ?",
+                (session_id, limit)
+            ).fetchall()
+        else:
+            rows = self._connect().execute(
+                "SELECT turn, role, content FROM messages WHERE session_id = ? AND turn < ? "
+                "ORDER BY turn DESC LIMIT ?",
+                (session_id, before_turn, limit)
+            ).fetchall()
+        return [dict(row) for row in reversed(rows)]
+
+
+_store: Optional[ConversationStore] = None
+_store_lock = threading.Lock()
+
+
+def get_conversation_store() -> ConversationStore:
+    """
+    Zwraca wspólny dla procesu magazyn rozmów.
+    
+    Returns:
+        ConversationStore: Magazyn rozmów w Config.CONVERSATION_DB_PATH
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ConversationStore()
+        return _store
@@ -0,0 +1,263 @@
+"""
+Rejestr korpusów (norm) i wyszukiwanie rozproszone po shardach indeksu.
+"""
+import os
+import threading
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from langchain_openai import OpenAIEmbeddings
+from langchain_core.documents import Document
+
+from ..config.settings import Config
+from .clause_graph import estimate_tokens
+from .openai_clients import create_embeddings
+from .vector_store import VectorStoreManager
+
+if TYPE_CHECKING:
+    from .index_rebuilder import IndexRebuilder
+
+
+class CorpusRegistry:
+    """
+    Rejestr korpusów zdefiniowanych w Config.CORPORA.
+    
+    Każdy korpus ma własny shard indeksu FAISS, budowany i wczytywany
+    niezależnie. Shard trafia do pamięci dopiero przy pierwszym zapytaniu,
+    a wyszukiwanie obejmuje tylko shardy z opublikowaną wersją - brakujące
+    są budowane w tle przez IndexRebuilder rejestru.
+    """
+    
+    def __init__(self, embeddings: Optional[OpenAIEmbeddings] = None):
+        self._embeddings = embeddings
+        self._managers: Dict[str, VectorStoreManager] = {}
+        self._rebuilder: Optional["IndexRebuilder"] = None
+        self._lock = threading.Lock()
+    
+    @property
+    def embeddings(self) -> OpenAIEmbeddings:
+        """
+        Model embeddingów zapytań, tworzony przy pierwszym wyszukiwaniu.
+        
+        Lista korpusów i stan przebudowy nie wymagają klienta API,
+        więc panel boczny działa także bez klucza OPENAI_API_KEY.
+        """
+        with self._lock:
+            if self._embeddings is None:
+                self._embeddings = create_embeddings()
+            return self._embeddings
+    
+    def available_corpora(self) -> Dict[str, str]:
+        """
+        Zwraca korpusy, dla których istnieje dokument źródłowy lub zbudowany shard.
+        
+        Returns:
+            Dict[str, str]: Mapowanie identyfikatora korpusu na jego nazwę
+        """
+        return {
+            corpus_id: corpus["name"]
+            for corpus_id, corpus in Config.CORPORA.items()
+            if os.path.exists(corpus["path"]) or os.path.exists(Config.get_index_path(corpus_id))
+        }
+    
+    def loaded_corpora(self) -> List[str]:
+        """Zwraca identyfikatory shardów wczytanych do pamięci w tym procesie."""
+        with self._lock:
+            return [corpus_id for corpus_id, manager in self._managers.items() if manager.is_loaded()]
+    
+    def get_manager(self, corpus_id: str) -> VectorStoreManager:
+        """
+        Zwraca menedżera shardu dla korpusu, tworząc go przy pierwszym użyciu.
+        
+        Args:
+            corpus_id: Identyfikator korpusu
+        
+        Returns:
+            VectorStoreManager: Menedżer shardu
+        """
+        with self._lock:
+            manager = self._managers.get(corpus_id)
+            if manager is None:
+                manager = VectorStoreManager(corpus_id, self._embeddings)
+                manager.adopt_legacy_index()
+                self._managers[corpus_id] = manager
+            return manager
+    
+    @property
+    def rebuilder(self) -> "IndexRebuilder":
+        """Obiekt przebudowy shardów tego rejestru."""
+        # Import lokalny - moduł index_rebuilder importuje rejestr
+        from .index_rebuilder import IndexRebuilder
+        with self._lock:
+            if self._rebuilder is None:
+                self._rebuilder = IndexRebuilder(self)
+            return self._rebuilder
+    
+    def is_ready(self, corpus_id: str) -> bool:
+        """Czy korpus ma opublikowaną wersję indeksu."""
+        return self.get_manager(corpus_id).current_version() is not None
+    
+    def pending_corpora(self, corpus: Optional[str] = None) -> Dict[str, str]:
+        """
+        Zwraca wybrane korpusy bez opublikowanej wersji indeksu i zleca ich budowę w tle.
+        
+        Budowa jest zlecana tylko dla korpusów wskazanych wprost oraz dla korpusu
+        domyślnego, więc przeszukiwanie wszystkich korpusów nie buduje każdego shardu.
+        Gotowe korpusy w starszym formacie indeksu są przebudowywane w tle,
+        a do czasu podmiany obsługuje je dotychczasowa wersja.
+        Po nieudanej budowie nie jest ponawiana - służy do tego przycisk przebudowy.
+        
+        Args:
+            corpus: Docelowy korpus (patrz resolve_corpora)
+        
+        Returns:
+            Dict[str, str]: Identyfikator korpusu -> stan ("building", "error" lub "not_built")
+        """
+        explicit = bool(corpus and corpus.strip())
+        pending: Dict[str, str] = {}
+        for corpus_id in self.resolve_corpora(corpus):
+            state = self.rebuilder.status(corpus_id)["state"]
+            if self.is_ready(corpus_id):
+                if self.get_manager(corpus_id).is_outdated() and state not in ("running", "error"):
+                    self.rebuilder.start(corpus_id)
+                continue
+            if state not in ("running", "error") and (explicit or corpus_id == Config.DEFAULT_CORPUS) \
+                    and os.path.exists(Config.CORPORA[corpus_id]["path"]):
+                self.rebuilder.start(corpus_id)
+                state = "running"
+            pending[corpus_id] = {"running": "building", "error": "error"}.get(state, "not_built")
+        return pending
+    
+    def resolve_corpora(self, corpus: Optional[str] = None) -> List[str]:
+        """
+        Ustala, które shardy przeszukać.
+        
+        Args:
+            corpus: Identyfikator lub nazwa korpusu, kilka rozdzielonych przecinkami,
+                albo None, aby przeszukać wszystkie dostępne korpusy
+        
+        Returns:
+            List[str]: Lista identyfikatorów korpusów
+        """
+        available = self.available_corpora()
+        if not corpus or not corpus.strip():
+            return list(available)
+        
+        lookup = {corpus_id.lower(): corpus_id for corpus_id in available}
+        lookup.update({name.lower(): corpus_id for corpus_id, name in available.items()})
+        
+        corpus_ids = []
+        for requested in corpus.split(","):
+            key = requested.strip().lower()
+            if not key:
+                continue
+            if key not in lookup:
+                raise ValueError(
+                    f"Nieznany korpus: {requested.strip()}. Dostępne: {', '.join(available)}"
+                )
+            if lookup[key] not in corpus_ids:
+                corpus_ids.append(lookup[key])
+        return corpus_ids
+    
+    def search(self, query: str, corpus: Optional[str] = None, k: int = Config.RETRIEVAL_K) -> List[Tuple[Document, float]]:
+        """
+        Przeszukuje wybrane shardy i scala wyniki według odległości.
+        
+        Zapytanie jest embedowane raz i używane we wszystkich shardach;
+        wszystkie shardy korzystają z tego samego modelu embeddingów,
+        więc odległości są porównywalne. Shardy bez opublikowanej wersji
+        są pomijane (patrz pending_corpora).
+        
+        Args:
+            query: Zapytanie
+            corpus: Docelowy korpus (patrz resolve_corpora)
+            k: Liczba zwracanych wyników
+        
+        Returns:
+            List[Tuple[Document, float]]: Dokumenty z odległością (mniejsza = lepsza)
+        """
+        corpus_ids = [corpus_id for corpus_id in self.resolve_corpora(corpus) if self.is_ready(corpus_id)]
+        if not corpus_ids:
+            return []
+        
+        query_embedding = self.embeddings.embed_query(query)
+        results: List[Tuple[Document, float]] = []
+        for corpus_id in corpus_ids:
+            vector_store = self.get_manager(corpus_id).get_or_create_vector_store()
+            for doc, score in vector_store.similarity_search_with_score_by_vector(query_embedding, k=k):
+                # Indeks starszego wydania nie ma oznaczenia korpusu w metadanych
+                doc.metadata.setdefault("corpus", corpus_id)
+                results.append((doc, score))
+        
+        results.sort(key=lambda item: item[1])
+        return results[:k]
+    
+    def expand_references(
+        self,
+        docs: List[Document],
+        token_budget: int = Config.REFERENCE_TOKEN_BUDGET,
+        digest_tokens: int = Config.REFERENCE_DIGEST_TOKENS
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Dołącza skróty klauzul, do których odwołują się znalezione fragmenty (jeden krok w grafie).
+        
+        Odwołania są dołączane w kolejności wyników, aż do wyczerpania budżetu tokenów.
+        Klauzule obecne już w wynikach (także jako warianty reprezentanta)
+        lub dołączone wcześniej są pomijane.
+        
+        Args:
+            docs: Znalezione dokumenty, od najlepszego
+            token_budget: Łączny limit tokenów dla wszystkich skrótów
+            digest_tokens: Limit tokenów pojedynczego skrótu
+            
+        Returns:
+            List[List[Dict]]: Dla każdego dokumentu lista odwołań (clause, title, digest)
+        """
+        seen = {(doc.metadata.get("corpus"), doc.metadata.get("clause_number")) for doc in docs}
+        seen.update(
+            (doc.metadata.get("corpus"), clause)
+            for doc in docs
+            for clause in doc.metadata.get("variants", {})
+        )
+        remaining = token_budget
+        expanded: List[List[Dict[str, Any]]] = []
+        
+        for doc in docs:
+            corpus_id = doc.metadata.get("corpus")
+            references: List[Dict[str, Any]] = []
+            graph = self.get_manager(corpus_id).get_clause_graph() if corpus_id in Config.CORPORA else None
+            if graph is not None:
+                for target in graph.references_of(doc.metadata.get("clause_number")):
+                    if remaining <= 0:
+                        break
+                    if (corpus_id, target) in seen or (corpus_id, graph.canonical(target)) in seen:
+                        continue
+                    digest = graph.digest(target, min(digest_tokens, remaining))
+                    if not digest:
+                        continue
+                    # Także reprezentant - inne warianty tej samej klauzuli mają niemal identyczny skrót
+                    seen.update({(corpus_id, target), (corpus_id, graph.canonical(target))})
+                    remaining -= estimate_tokens(digest)
+                    references.append({"clause": target, "title": graph.titles.get(target, target), "digest": digest})
+            expanded.append(references)
+        
+        return expanded
+
+
+_registry: Optional[CorpusRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_corpus_registry() -> CorpusRegistry:
+    """
+    Zwraca wspólny dla procesu rejestr korpusów.
+    
+    Wszystkie sesje korzystają z tych samych, leniwie wczytanych shardów.
+    
+    Returns:
+        CorpusRegistry: Rejestr korpusów
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = CorpusRegistry()
+        return _registry
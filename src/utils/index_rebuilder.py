@@ -0,0 +1,133 @@
+"""
+Przebudowa shardów indeksu w tle z atomową podmianą wersji.
+"""
+import threading
+import time
+from typing import Any, Dict
+
+from .corpus_registry import CorpusRegistry, get_corpus_registry
+from .request_scheduler import PRIORITY_BATCH, RequestScheduler
+
+
+class IndexRebuilder:
+    """
+    Uruchamia przebudowę shardów w wątkach roboczych.
+    
+    Nowa wersja jest budowana obok aktywnej i podmieniana dopiero po
+    zakończeniu budowy, więc sesje korzystają ze starego indeksu aż do
+    podmiany, a potem przy kolejnym zapytaniu przechodzą na nowy.
+    """
+    
+    def __init__(self, registry: CorpusRegistry):
+        self.registry = registry
+        self._status: Dict[str, Dict[str, Any]] = {}
+        self._threads: Dict[str, threading.Thread] = {}
+        self._lock = threading.Lock()
+    
+    def start(self, corpus_id: str) -> bool:
+        """
+        Zleca przebudowę shardu w tle.
+        
+        Args:
+            corpus_id: Identyfikator korpusu
+        
+        Returns:
+            bool: False, jeśli przebudowa tego korpusu już trwa
+        """
+        manager = self.registry.get_manager(corpus_id)
+        with self._lock:
+            if self._is_running(corpus_id) or manager.is_building():
+                return False
+            
+            self._status[corpus_id] = {
+                "state": "running",
+                "progress": 0.0,
+                "message": "Oczekiwanie na start",
+                "version": None,
+                "error": None,
+                "started_at": time.time(),
+                "finished_at": None
+            }
+            thread = threading.Thread(
+                target=self._run,
+                args=(corpus_id,),
+                name=f"index-rebuild-{corpus_id}",
+                daemon=True
+            )
+            self._threads[corpus_id] = thread
+            thread.start()
+            return True
+    
+    def is_running(self, corpus_id: str) -> bool:
+        """Czy przebudowa korpusu jest w toku."""
+        with self._lock:
+            return self._is_running(corpus_id)
+    
+    def status(self, corpus_id: str) -> Dict[str, Any]:
+        """
+        Zwraca stan ostatniej przebudowy korpusu.
+        
+        Args:
+            corpus_id: Identyfikator korpusu
+        
+        Returns:
+            Dict: Stan ("idle", "running", "done", "error"), postęp 0.0-1.0,
+                komunikat, zbudowana wersja, błąd, aktywna wersja oraz to,
+                czy aktywna wersja ma nieaktualny format ("outdated")
+        """
+        with self._lock:
+            status = dict(self._status.get(corpus_id, {"state": "idle", "progress": 0.0}))
+        manager = self.registry.get_manager(corpus_id)
+        status["active_version"] = manager.current_version()
+        status["outdated"] = manager.is_outdated()
+        return status
+    
+    def _is_running(self, corpus_id: str) -> bool:
+        thread = self._threads.get(corpus_id)
+        return thread is not None and thread.is_alive()
+    
+    def _update(self, corpus_id: str, **changes: Any) -> None:
+        with self._lock:
+            self._status[corpus_id].update(changes)
+    
+    def _run(self, corpus_id: str) -> None:
+        """Buduje nową wersję i podmienia ją po zakończeniu (wątek roboczy)."""
+        manager = self.registry.get_manager(corpus_id)
+        try:
+            # Embedding całego dokumentu nie może wypierać zapytań użytkowników
+            with RequestScheduler.priority(PRIORITY_BATCH):
+                version, vector_store = manager.build_new_version(
+                    progress_callback=lambda progress, message: self._update(
+                        corpus_id, progress=progress, message=message
+                    )
+                )
+            if manager.activate_version(version, vector_store):
+                message = f"Aktywna wersja: {version}"
+            else:
+                message = f"Wersja {version} nie została aktywowana - aktywna jest już nowsza"
+            self._update(
+                corpus_id,
+                state="done",
+                progress=1.0,
+                message=message,
+                version=version,
+                finished_at=time.time()
+            )
+        except Exception as e:
+            self._update(
+                corpus_id,
+                state="error",
+                message="Przebudowa nie powiodła się",
+                error=str(e),
+                finished_at=time.time()
+            )
+
+
+def get_index_rebuilder() -> IndexRebuilder:
+    """
+    Zwraca wspólny dla procesu obiekt przebudowy indeksów.
+    
+    Returns:
+        IndexRebuilder: Obiekt przebudowy działający na wspólnym rejestrze korpusów
+    """
+    return get_corpus_registry().rebuilder
@@ -0,0 +1,42 @@
+"""
+Fabryki klientów OpenAI korzystających ze wspólnego harmonogramu zapytań.
+"""
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
+from ..config.settings import Config
+from .request_scheduler import get_request_scheduler
+
+
+def create_chat_model(model_name: str = Config.DEFAULT_MODEL, temperature: float = Config.DEFAULT_TEMPERATURE) -> ChatOpenAI:
+    """
+    Tworzy model czatu kierujący zapytania przez wspólny harmonogram.
+    
+    Ponawianiem zapytań zajmuje się harmonogram, więc wbudowane ponawianie klienta jest wyłączone.
+    
+    Args:
+        model_name: Nazwa modelu
+        temperature: Temperatura modelu
+        
+    Returns:
+        ChatOpenAI: Model czatu
+    """
+    return ChatOpenAI(
+        model_name=model_name,
+        temperature=temperature,
+        http_client=get_request_scheduler().http_client,
+        max_retries=0
+    )
+
+
+def create_embeddings() -> OpenAIEmbeddings:
+    """
+    Tworzy model embeddingów kierujący zapytania przez wspólny harmonogram.
+    
+    Returns:
+        OpenAIEmbeddings: Model embeddingów (Config.EMBEDDING_MODEL)
+    """
+    return OpenAIEmbeddings(
+        model=Config.EMBEDDING_MODEL,
+        http_client=get_request_scheduler().http_client,
+        max_retries=0
+    )
@@ -0,0 +1,297 @@
+"""
+Wspólny dla procesu harmonogram zapytań do API OpenAI.
+
+Wszystkie zapytania LLM i embeddingów przechodzą przez jeden transport HTTP,
+który pilnuje limitów zapytań i tokenów na minutę, obsługuje priorytety
+(interaktywne przed wsadowymi), ponawia zapytania z losowym opóźnieniem
+i współdzieli pulę połączeń.
+"""
+import contextlib
+import contextvars
+import heapq
+import itertools
+import json
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+from ..config.settings import Config
+
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+
+# Kody odpowiedzi, po których zapytanie jest ponawiane
+RETRY_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+_current_priority: contextvars.ContextVar = contextvars.ContextVar(
+    "normica_request_priority", default=PRIORITY_INTERACTIVE
+)
+
+
+class TokenBucket:
+    """Kubełek tokenów uzupełniany w stałym tempie (bez własnej synchronizacji)."""
+    
+    def __init__(self, capacity: float, refill_per_second: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.clock = clock
+        self.level = capacity
+        self.updated_at = clock()
+    
+    def _refill(self) -> None:
+        now = self.clock()
+        self.level = min(self.capacity, self.level + (now - self.updated_at) * self.refill_per_second)
+        self.updated_at = now
+    
+    def time_until(self, amount: float) -> float:
+        """Zwraca liczbę sekund do chwili, gdy w kubełku będzie `amount` tokenów."""
+        self._refill()
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.refill_per_second
+    
+    def consume(self, amount: float) -> None:
+        """Pobiera tokeny z kubełka (poziom może spaść poniżej zera)."""
+        self._refill()
+        self.level -= amount
+    
+    def limit_to(self, amount: float) -> None:
+        """Obniża poziom kubełka, jeśli serwer zgłasza mniejszy zapas."""
+        self._refill()
+        self.level = min(self.level, amount)
+
+
+class RequestScheduler:
+    """
+    Harmonogram zapytań z kubełkami zapytań i tokenów na minutę.
+    
+    OpenAI liczy limity osobno dla każdego modelu, dlatego każdy model
+    (pole "model" zapytania) ma własne kubełki i własną kolejkę priorytetową.
+    Zapytanie jest wysyłane, gdy jest pierwsze w kolejce swojego modelu
+    i oba jego kubełki mają wystarczający zapas.
+    """
+    
+    def __init__(
+        self,
+        requests_per_minute: int = Config.OPENAI_REQUESTS_PER_MINUTE,
+        tokens_per_minute: int = Config.OPENAI_TOKENS_PER_MINUTE,
+        max_retries: int = Config.OPENAI_MAX_RETRIES,
+        retry_base_delay: float = Config.OPENAI_RETRY_BASE_DELAY,
+        retry_max_delay: float = Config.OPENAI_RETRY_MAX_DELAY,
+        max_connections: int = Config.OPENAI_MAX_CONNECTIONS,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.max_connections = max_connections
+        self.clock = clock
+        self.sleep = sleep
+        
+        self._requests: Dict[str, TokenBucket] = {}
+        self._tokens: Dict[str, TokenBucket] = {}
+        self._waiting: Dict[str, List[Tuple[int, int]]] = {}
+        self._condition = threading.Condition()
+        self._sequence = itertools.count()
+        self._http_client: Optional[httpx.Client] = None
+    
+    @staticmethod
+    @contextlib.contextmanager
+    def priority(priority: int) -> Iterator[None]:
+        """
+        Ustawia priorytet zapytań wysyłanych w bieżącym wątku.
+        
+        Args:
+            priority: PRIORITY_INTERACTIVE lub PRIORITY_BATCH
+        """
+        token = _current_priority.set(priority)
+        try:
+            yield
+        finally:
+            _current_priority.reset(token)
+    
+    def _buckets(self, model: str) -> Tuple[TokenBucket, TokenBucket]:
+        """Zwraca kubełki zapytań i tokenów modelu, tworząc je przy pierwszym użyciu (pod blokadą)."""
+        if model not in self._requests:
+            self._requests[model] = TokenBucket(self.requests_per_minute, self.requests_per_minute / 60.0, self.clock)
+            self._tokens[model] = TokenBucket(self.tokens_per_minute, self.tokens_per_minute / 60.0, self.clock)
+            self._waiting[model] = []
+        return self._requests[model], self._tokens[model]
+    
+    def acquire(self, tokens: int, priority: Optional[int] = None, model: str = "") -> None:
+        """
+        Blokuje do chwili, gdy zapytanie może zostać wysłane.
+        
+        Args:
+            tokens: Szacowana liczba tokenów zapytania
+            priority: Priorytet; domyślnie ustawiony przez priority()
+            model: Model, którego limity obowiązują zapytanie
+        """
+        if priority is None:
+            priority = _current_priority.get()
+        tokens = min(tokens, self.tokens_per_minute)
+        
+        with self._condition:
+            requests, token_bucket = self._buckets(model)
+            waiting = self._waiting[model]
+            ticket = (priority, next(self._sequence))
+            heapq.heappush(waiting, ticket)
+            try:
+                while True:
+                    timeout = None
+                    if waiting[0] == ticket:
+                        timeout = max(requests.time_until(1), token_bucket.time_until(tokens))
+                        if timeout <= 0:
+                            requests.consume(1)
+                            token_bucket.consume(tokens)
+                            return
+                    self._condition.wait(timeout)
+            finally:
+                waiting.remove(ticket)
+                heapq.heapify(waiting)
+                self._condition.notify_all()
+    
+    def observe_response(self, response: httpx.Response, model: str = "") -> None:
+        """Synchronizuje kubełek tokenów modelu z nagłówkami limitów zwróconymi przez API dla tego modelu."""
+        remaining = response.headers.get("x-ratelimit-remaining-tokens")
+        if remaining is None:
+            return
+        try:
+            remaining_tokens = float(remaining)
+        except ValueError:
+            return
+        with self._condition:
+            self._buckets(model)[1].limit_to(remaining_tokens)
+    
+    def retry_delay(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        """
+        Zwraca opóźnienie przed kolejną próbą (wykładnicze z pełnym losowaniem).
+        
+        Nagłówek Retry-After, jeśli jest obecny, wyznacza minimalne opóźnienie.
+        """
+        delay = random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt))
+        if response is not None:
+            try:
+                delay = max(delay, float(response.headers.get("retry-after", 0)))
+            except ValueError:
+                pass
+        return delay
+    
+    @property
+    def http_client(self) -> httpx.Client:
+        """Wspólny klient HTTP z pulą połączeń, kierujący zapytania przez harmonogram."""
+        with self._condition:
+            if self._http_client is None:
+                self._http_client = httpx.Client(
+                    transport=ScheduledTransport(
+                        self,
+                        httpx.HTTPTransport(
+                            limits=httpx.Limits(
+                                max_connections=self.max_connections,
+                                max_keepalive_connections=self.max_connections
+                            )
+                        )
+                    ),
+                    timeout=httpx.Timeout(600.0, connect=5.0)
+                )
+            return self._http_client
+
+
+def _request_body(request: httpx.Request) -> Dict[str, Any]:
+    """Zwraca treść zapytania JSON jako słownik (pusty, jeśli to nie JSON)."""
+    try:
+        body = json.loads(request.content) if request.content else {}
+    except ValueError:
+        return {}
+    return body if isinstance(body, dict) else {}
+
+
+def request_model(request: httpx.Request) -> str:
+    """
+    Zwraca model, którego dotyczy zapytanie (pole "model" treści).
+    
+    Args:
+        request: Zapytanie HTTP do API OpenAI
+    
+    Returns:
+        str: Nazwa modelu lub pusty napis, jeśli zapytanie go nie podaje
+    """
+    return str(_request_body(request).get("model") or "")
+
+
+def estimate_request_tokens(request: httpx.Request) -> int:
+    """
+    Szacuje liczbę tokenów zapytania (ok. 4 znaki na token plus limit odpowiedzi).
+    
+    Args:
+        request: Zapytanie HTTP do API OpenAI
+    
+    Returns:
+        int: Szacowana liczba tokenów
+    """
+    body = _request_body(request)
+    return len(request.content) // 4 + int(body.get("max_completion_tokens") or body.get("max_tokens") or 0)
+
+
+class ScheduledTransport(httpx.BaseTransport):
+    """Transport httpx przepuszczający zapytania przez RequestScheduler i ponawiający je."""
+    
+    def __init__(self, scheduler: RequestScheduler, transport: httpx.BaseTransport):
+        self.scheduler = scheduler
+        self.transport = transport
+    
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.read()
+        tokens = estimate_request_tokens(request)
+        model = request_model(request)
+        
+        attempt = 0
+        while True:
+            self.scheduler.acquire(tokens, model=model)
+            try:
+                response = self.transport.handle_request(request)
+            except httpx.TransportError:
+                if attempt >= self.scheduler.max_retries:
+                    raise
+                self.scheduler.sleep(self.scheduler.retry_delay(attempt))
+                attempt += 1
+                continue
+            
+            self.scheduler.observe_response(response, model)
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= self.scheduler.max_retries:
+                return response
+            
+            # Odczyt treści zwraca połączenie do puli
+            delay = self.scheduler.retry_delay(attempt, response)
+            response.read()
+            response.close()
+            self.scheduler.sleep(delay)
+            attempt += 1
+    
+    def close(self) -> None:
+        self.transport.close()
+
+
+_scheduler: Optional[RequestScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_request_scheduler() -> RequestScheduler:
+    """
+    Zwraca wspólny dla procesu harmonogram zapytań.
+    
+    Returns:
+        RequestScheduler: Harmonogram zapytań do API OpenAI
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RequestScheduler()
+        return _scheduler
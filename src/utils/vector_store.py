@@ -1,93 +1,336 @@
 """
 Zarządzanie bazą wektorową FAISS.
 """
+import datetime
 import os
+import shutil
+import threading
+import uuid
 import streamlit as st
 from langchain_openai import OpenAIEmbeddings
 from langchain_community.vectorstores import FAISS
 from langchain_text_splitters import MarkdownTextSplitter
 from langchain_core.documents import Document
-from typing import Optional
+from typing import Callable, List, Optional, Tuple
 
 from ..config.settings import Config
 from .advanced_chunking import chunk_markdown_by_header
+from .clause_alignment import align_parallel_clauses
+from .clause_graph import ClauseGraph
+from .openai_clients import create_embeddings
+
+
+# Wywoływane jako progress_callback(postęp 0.0-1.0, komunikat)
+ProgressCallback = Callable[[float, str], None]
+
+CURRENT_VERSION_FILE = "CURRENT"
+VERSION_PREFIX = "v"
+TMP_PREFIX = ".tmp-"
+
+# Znacznik formatu zapisywany w katalogu każdej wersji. Zwiększ, gdy zmienia się
+# zawartość wersji (metadane chunków, graf odwołań, aliasy klauzul równoległych) -
+# wersje bez znacznika lub ze starszym są przebudowywane w tle.
+INDEX_FORMAT_FILE = "FORMAT"
+INDEX_FORMAT_VERSION = 2
+
+# Indeks zapisany przez starsze wydania bezpośrednio w Config.FAISS_INDEX_PATH
+LEGACY_INDEX_FILES = ("index.faiss", "index.pkl")
+# Sortuje się przed każdą budowaną wersją, więc pierwsza przebudowa go zastępuje
+LEGACY_VERSION = f"{VERSION_PREFIX}00000000-000000-000000-legacy"
+
+
+class IndexNotReadyError(RuntimeError):
+    """Korpus nie ma jeszcze opublikowanej wersji indeksu (pierwsza budowa trwa lub nie została zlecona)."""
+
+
+class IndexBuildInProgressError(RuntimeError):
+    """Budowa indeksu korpusu już trwa w innym wątku."""
 
 
 class VectorStoreManager:
-    """Zarządza bazą wektorową FAISS."""
+    """
+    Zarządza bazą wektorową FAISS jednego korpusu (shardu indeksu).
     
-    def __init__(self, embeddings: Optional[OpenAIEmbeddings] = None):
-        self.embeddings = embeddings or OpenAIEmbeddings()
-        self.vector_store: Optional[FAISS] = None
+    Każda przebudowa zapisuje nową wersję w osobnym katalogu
+    (faiss_index/<korpus>/v<data i czas>-<id>), a plik CURRENT wskazuje wersję aktywną.
+    Podmiana wersji to atomowa zamiana pliku CURRENT, więc indeks jest
+    dostępny przez cały czas przebudowy.
+    
+    Menedżer nigdy nie buduje indeksu w ścieżce zapytania: wersje buduje
+    IndexRebuilder w wątku roboczym, a jednocześnie może trwać tylko jedna
+    budowa danego korpusu.
+    """
     
-    def delete_index(self) -> None:
-        """Usuwa istniejący indeks FAISS."""
-        if os.path.exists(Config.FAISS_INDEX_PATH):
-            try:
-                import shutil
-                shutil.rmtree(Config.FAISS_INDEX_PATH)
-                st.warning("Usunięto poprzednią bazę wektorową.")
-            except Exception as e:
-                st.error(f"Błąd przy usuwaniu bazy wektorowej: {e}")
+    def __init__(self, corpus_id: str = Config.DEFAULT_CORPUS, embeddings: Optional[OpenAIEmbeddings] = None):
+        if corpus_id not in Config.CORPORA:
+            raise ValueError(f"Nieznany korpus: {corpus_id}")
+        
+        self.corpus_id = corpus_id
+        self.source_path = Config.CORPORA[corpus_id]["path"]
+        self.parallel_chapters = Config.CORPORA[corpus_id].get("parallel_chapters", [])
+        self.index_path = Config.get_index_path(corpus_id)
+        self._embeddings = embeddings
+        self.vector_store: Optional[FAISS] = None
+        self.loaded_version: Optional[str] = None
+        self.clause_graph = ClauseGraph()
+        self._lock = threading.RLock()
+        self._build_lock = threading.Lock()
     
-    def rebuild_index(self) -> FAISS:
-        """Wymusza przebudowanie indeksu FAISS."""
-        self.delete_index()
-        self.vector_store = None
-        return self._create_new_index()
+    @property
+    def embeddings(self) -> OpenAIEmbeddings:
+        """Model embeddingów, tworzony dopiero przy budowie lub wczytaniu shardu."""
+        with self._lock:
+            if self._embeddings is None:
+                self._embeddings = create_embeddings()
+            return self._embeddings
     
-    def get_or_create_vector_store(self, force_rebuild: bool = False) -> FAISS:
+    def get_or_create_vector_store(self) -> FAISS:
         """
-        Wczytuje istniejącą bazę wektorową lub tworzy nową.
+        Wczytuje aktywną wersję bazy wektorowej.
+        
+        Jeśli inny wątek lub proces opublikował nowszą wersję,
+        zostanie ona wczytana zamiast dotychczasowej. Brakującej bazy
+        nie buduje - pierwszą wersję trzeba zlecić przez IndexRebuilder.
         
-        Args:
-            force_rebuild: Czy wymusić przebudowę bazy, nawet jeśli istnieje
-            
         Returns:
             FAISS: Baza wektorowa
+        
+        Raises:
+            IndexNotReadyError: Jeśli korpus nie ma jeszcze żadnej wersji
         """
-        if self.vector_store is not None:
+        with self._lock:
+            version = self.current_version()
+            if self.vector_store is not None and version == self.loaded_version:
+                return self.vector_store
+            if version is None:
+                raise IndexNotReadyError(f"Baza wiedzy korpusu {self.corpus_id} nie jest jeszcze zbudowana")
+            
+            self.vector_store = self._load_existing_index(version)
+            self.clause_graph = ClauseGraph.load(os.path.join(self.index_path, version))
+            self.loaded_version = version
             return self.vector_store
+    
+    def adopt_legacy_index(self) -> bool:
+        """
+        Publikuje indeks starszego wydania jako wersję shardu korpusu domyślnego.
         
-        if force_rebuild:
-            return self.rebuild_index()
-            
-        if os.path.exists(Config.FAISS_INDEX_PATH):
-            self.vector_store = self._load_existing_index()
-        else:
-            self.vector_store = self._create_new_index()
-            
-        return self.vector_store
+        Pliki index.faiss i index.pkl z Config.FAISS_INDEX_PATH są przenoszone
+        do katalogu wersji LEGACY_VERSION, jeśli shard nie ma jeszcze żadnej wersji.
+        Dzięki temu istniejący indeks obsługuje zapytania, a nowa wersja
+        powstaje w tle.
+        
+        Returns:
+            bool: Czy indeks starszego wydania został opublikowany
+        """
+        legacy_paths = [os.path.join(Config.FAISS_INDEX_PATH, name) for name in LEGACY_INDEX_FILES]
+        if self.corpus_id != Config.DEFAULT_CORPUS or not all(os.path.exists(path) for path in legacy_paths):
+            return False
+        
+        with self._lock:
+            if self.current_version() is not None:
+                return False
+            version_path = os.path.join(self.index_path, LEGACY_VERSION)
+            os.makedirs(version_path, exist_ok=True)
+            for path in legacy_paths:
+                os.replace(path, os.path.join(version_path, os.path.basename(path)))
+            return self.activate_version(LEGACY_VERSION)
     
-    def _load_existing_index(self) -> FAISS:
-        """Wczytuje istniejący indeks FAISS."""
-        st.info("Wczytuję bazę wiedzy...")
-        return FAISS.load_local(
-            Config.FAISS_INDEX_PATH, 
-            self.embeddings, 
-            allow_dangerous_deserialization=True
-        )
+    def is_building(self) -> bool:
+        """Czy w tym procesie trwa budowa nowej wersji shardu."""
+        return self._build_lock.locked()
     
-    def _create_new_index(self) -> FAISS:
-        """Tworzy nowy indeks FAISS z dokumentu normy."""
-        st.info("Tworzę nową bazę wiedzy z dokumentu normy. To może chwilę potrwać...")
-
-        # Wczytanie dokumentu normy
-        with open(Config.NORM_FILE_PATH, "r", encoding="utf-8") as f:
+    def is_loaded(self) -> bool:
+        """Czy shard jest już wczytany do pamięci."""
+        return self.vector_store is not None
+    
+    def get_clause_graph(self) -> ClauseGraph:
+        """
+        Zwraca graf odwołań między klauzulami dla aktywnej wersji indeksu.
+        
+        Returns:
+            ClauseGraph: Graf odwołań
+        """
+        with self._lock:
+            self.get_or_create_vector_store()
+            return self.clause_graph
+    
+    def current_version(self) -> Optional[str]:
+        """
+        Zwraca nazwę aktywnej wersji indeksu.
+        
+        Returns:
+            Optional[str]: Nazwa wersji lub None, jeśli indeks nie istnieje
+        """
+        try:
+            with open(os.path.join(self.index_path, CURRENT_VERSION_FILE), "r", encoding="utf-8") as f:
+                version = f.read().strip()
+        except FileNotFoundError:
+            return None
+        
+        if version and os.path.isdir(os.path.join(self.index_path, version)):
+            return version
+        return None
+    
+    def index_format(self, version: str) -> int:
+        """
+        Zwraca format wskazanej wersji indeksu.
+        
+        Args:
+            version: Nazwa wersji
+        
+        Returns:
+            int: Format wersji lub 0, jeśli wersja nie ma znacznika formatu
+        """
+        try:
+            with open(os.path.join(self.index_path, version, INDEX_FORMAT_FILE), "r", encoding="utf-8") as f:
+                return int(f.read().strip())
+        except (FileNotFoundError, ValueError):
+            return 0
+    
+    def is_outdated(self) -> bool:
+        """Czy aktywna wersja została zbudowana w starszym formacie i wymaga przebudowy."""
+        version = self.current_version()
+        return version is not None and self.index_format(version) < INDEX_FORMAT_VERSION
+    
+    def build_new_version(self, progress_callback: Optional[ProgressCallback] = None) -> Tuple[str, FAISS]:
+        """
+        Buduje nową wersję indeksu w osobnym katalogu, nie dotykając wersji aktywnej.
+        
+        Nie korzysta z elementów interfejsu Streamlit, więc może działać w wątku roboczym.
+        
+        Args:
+            progress_callback: Funkcja raportująca postęp budowy
+        
+        Returns:
+            Tuple[str, FAISS]: Nazwa nowej wersji i zbudowana baza wektorowa
+        
+        Raises:
+            IndexBuildInProgressError: Jeśli budowa tego korpusu już trwa
+        """
+        if not self._build_lock.acquire(blocking=False):
+            raise IndexBuildInProgressError(f"Budowa bazy wiedzy korpusu {self.corpus_id} już trwa")
+        try:
+            return self._build_new_version(progress_callback or (lambda progress, message: None))
+        finally:
+            self._build_lock.release()
+    
+    def _build_new_version(self, report: ProgressCallback) -> Tuple[str, FAISS]:
+        """Buduje nową wersję indeksu (wywoływane pod blokadą budowy)."""
+        self._remove_stale_builds()
+        report(0.0, "Wczytywanie i dzielenie dokumentu")
+        with open(self.source_path, "r", encoding="utf-8") as f:
             norm_text = f.read()
-
+        
         # Zaawansowany chunking
         # Używamy funkcji chunk_markdown_by_header, która dzieli tekst do poziomu nagłówka 4
         docs = chunk_markdown_by_header(norm_text)
-
-        # Utworzenie bazy wektorowej
-        vector_store = FAISS.from_documents(docs, self.embeddings)
         
-        # Zapisanie indeksu
-        vector_store.save_local(Config.FAISS_INDEX_PATH)
-        st.success(f"Baza wiedzy została pomyślnie utworzona z {len(docs)} chunków.")
+        # Oznaczenie korpusu, aby wyniki z różnych shardów dało się rozróżnić
+        for doc in docs:
+            doc.metadata["corpus"] = self.corpus_id
+        
+        # Graf odwołań między klauzulami, zapisywany razem z wersją indeksu
+        clause_graph = ClauseGraph.from_documents(docs)
+        
+        # Klauzule równoległe: wspólna treść embedowana raz, warianty jako różnice;
+        # odwołania wariantów są rozwijane dla reprezentanta
+        chunk_count = len(docs)
+        docs, clause_graph.aliases = align_parallel_clauses(docs, self.parallel_chapters)
+        clause_graph.merge_variant_references()
+        report(0.0, f"Scalono {len(clause_graph.aliases)} klauzul równoległych; do embeddingu: {len(docs)} z {chunk_count} chunków")
+        
+        # Embedding w partiach, aby raportować postęp
+        texts = [doc.page_content for doc in docs]
+        vectors: List[List[float]] = []
+        batch_size = Config.EMBEDDING_BATCH_SIZE
+        for start in range(0, len(texts), batch_size):
+            vectors.extend(self.embeddings.embed_documents(texts[start:start + batch_size]))
+            done = min(start + batch_size, len(texts))
+            report(0.9 * done / len(texts), f"Embedding chunków: {done}/{len(texts)}")
         
-        return vector_store
+        vector_store = FAISS.from_embeddings(
+            list(zip(texts, vectors)),
+            self.embeddings,
+            metadatas=[doc.metadata for doc in docs]
+        )
+        
+        # Zapis do katalogu tymczasowego i przeniesienie pod docelową nazwę,
+        # aby w katalogu wersji nigdy nie było niekompletnego indeksu
+        report(0.95, "Zapisywanie indeksu")
+        version = f"{VERSION_PREFIX}{datetime.datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{uuid.uuid4().hex[:4]}"
+        tmp_path = os.path.join(self.index_path, TMP_PREFIX + version)
+        try:
+            vector_store.save_local(tmp_path)
+            clause_graph.save(tmp_path)
+            with open(os.path.join(tmp_path, INDEX_FORMAT_FILE), "w", encoding="utf-8") as f:
+                f.write(str(INDEX_FORMAT_VERSION))
+            os.rename(tmp_path, os.path.join(self.index_path, version))
+        except Exception:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+        
+        report(1.0, f"Zbudowano wersję {version} z {len(docs)} chunków")
+        return version, vector_store
+    
+    def activate_version(self, version: str, vector_store: Optional[FAISS] = None) -> bool:
+        """
+        Atomowo ustawia wersję aktywną i usuwa najstarsze wersje.
+        
+        Wersja nie zastąpi nowszej (nazwy wersji rosną z czasem budowy),
+        więc wolniejsza, wcześniej rozpoczęta budowa nie cofa indeksu.
+        
+        Args:
+            version: Nazwa wersji zbudowanej przez build_new_version
+            vector_store: Zbudowana baza; jeśli podana, nie trzeba jej wczytywać z dysku
+        
+        Returns:
+            bool: False, jeśli aktywna jest już nowsza wersja
+        """
+        with self._lock:
+            current = self.current_version()
+            if current is not None and current > version:
+                return False
+            
+            pointer_path = os.path.join(self.index_path, CURRENT_VERSION_FILE)
+            tmp_pointer_path = f"{pointer_path}.{uuid.uuid4().hex[:6]}.tmp"
+            with open(tmp_pointer_path, "w", encoding="utf-8") as f:
+                f.write(version)
+            os.replace(tmp_pointer_path, pointer_path)
+            
+            if vector_store is not None:
+                self.vector_store = vector_store
+                self.clause_graph = ClauseGraph.load(os.path.join(self.index_path, version))
+                self.loaded_version = version
+        
+        self._prune_old_versions(version)
+        return True
+    
+    def _remove_stale_builds(self) -> None:
+        """Usuwa katalogi tymczasowe budów przerwanych razem z procesem (wywoływane pod blokadą budowy)."""
+        if not os.path.isdir(self.index_path):
+            return
+        for name in os.listdir(self.index_path):
+            if name.startswith(TMP_PREFIX):
+                shutil.rmtree(os.path.join(self.index_path, name), ignore_errors=True)
+    
+    def _prune_old_versions(self, active_version: str) -> None:
+        """Usuwa najstarsze wersje, zostawiając Config.INDEX_VERSIONS_TO_KEEP najnowszych."""
+        versions = sorted(
+            name for name in os.listdir(self.index_path)
+            if name.startswith(VERSION_PREFIX) and name != active_version
+        )
+        obsolete = versions[:max(len(versions) - (Config.INDEX_VERSIONS_TO_KEEP - 1), 0)]
+        for name in obsolete:
+            shutil.rmtree(os.path.join(self.index_path, name), ignore_errors=True)
+    
+    def _load_existing_index(self, version: str) -> FAISS:
+        """Wczytuje wskazaną wersję indeksu FAISS."""
+        st.info(f"Wczytuję bazę wiedzy ({self.corpus_id})...")
+        return FAISS.load_local(
+            os.path.join(self.index_path, version),
+            self.embeddings,
+            allow_dangerous_deserialization=True
+        )
     
     def get_retriever(self, **kwargs):
         """
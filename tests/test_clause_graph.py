@@ -0,0 +1,144 @@
+"""
+Testy grafu odwołań między klauzulami i jego rozwijania w wynikach wyszukiwania.
+"""
+import os
+
+import pytest
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from langchain_community.embeddings import FakeEmbeddings
+from langchain_core.documents import Document
+
+from src.config.settings import Config
+from src.utils.clause_alignment import align_parallel_clauses, expand_variants
+from src.utils.clause_graph import ClauseGraph, estimate_tokens, extract_references
+from src.utils.corpus_registry import CorpusRegistry
+
+
+def clause(number: str, text: str) -> Document:
+    return Document(
+        page_content=f"{number} Title\n{text}",
+        metadata={"clause_number": number, "header_text": f"{number} Title"}
+    )
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "FAISS_INDEX_PATH", str(tmp_path / "faiss_index"))
+    return CorpusRegistry(FakeEmbeddings(size=8))
+
+
+def use_graph(registry: CorpusRegistry, monkeypatch, graph: ClauseGraph) -> None:
+    monkeypatch.setattr(registry.get_manager(Config.DEFAULT_CORPUS), "get_clause_graph", lambda: graph)
+
+
+def result(number: str) -> Document:
+    return Document(page_content=number, metadata={"corpus": Config.DEFAULT_CORPUS, "clause_number": number})
+
+
+def test_extract_references():
+    text = (
+        "See clauses 7.1.1 and 7.1.2, clause 9.1 or clause 9.2, "
+        "clauses 11.5.2.5 to 11.5.2.17, Table 10.1 and again clause 9.1."
+    )
+    
+    assert extract_references(text) == [
+        "7.1.1", "7.1.2", "9.1", "9.2", "11.5.2.5", "11.5.2.17", "Table 10.1"
+    ]
+
+
+def test_graph_resolves_tables_and_drops_self_and_external_references():
+    docs = [
+        clause("5.1", "This clause 5.1 applies; see Table 10.1, clause 6.1 and clause 502.3 of Section 508."),
+        clause("6.1", "Requirements are listed below.\n\nTable 10.1: Requirements\n\n| a | b |"),
+    ]
+    
+    graph = ClauseGraph.from_documents(docs)
+    
+    assert graph.references_of("5.1") == ["6.1"]
+    assert graph.references_of("6.1") == []
+    assert graph.titles["6.1"] == "6.1 Title"
+
+
+def test_digest_is_cut_at_word_boundary():
+    graph = ClauseGraph(texts={"1": "alpha beta\ngamma delta"})
+    
+    assert graph.digest("1", 10) == "alpha beta gamma delta"
+    assert graph.digest("1", 3) == "alpha beta…"
+    assert graph.digest("1", 0) == ""
+    assert graph.digest("missing", 10) == ""
+
+
+def test_expansion_skips_clauses_already_in_results(registry, monkeypatch):
+    use_graph(registry, monkeypatch, ClauseGraph(
+        titles={"2": "2 Two", "3": "3 Three"},
+        texts={"1": "", "2": "two", "3": "three"},
+        references={"1": ["2", "3"]}
+    ))
+    
+    references = registry.expand_references([result("1"), result("2")])
+    
+    assert references == [[{"clause": "3", "title": "3 Three", "digest": "three"}], []]
+
+
+def test_expansion_shares_token_budget(registry, monkeypatch):
+    text = " ".join(["word"] * 100)
+    use_graph(registry, monkeypatch, ClauseGraph(
+        texts={"1": "", "2": "", "3": text, "4": text, "5": text},
+        references={"1": ["3", "4"], "2": ["5"]}
+    ))
+    
+    references = registry.expand_references([result("1"), result("2")], token_budget=50, digest_tokens=30)
+    
+    first, second = references
+    assert [reference["clause"] for reference in first] == ["3", "4"]
+    assert second == []
+    assert estimate_tokens(first[0]["digest"]) <= 31
+    assert len(first[1]["digest"]) < len(first[0]["digest"])
+    assert sum(estimate_tokens(reference["digest"]) for reference in first) <= 50
+
+
+def test_expansion_attaches_one_digest_per_parallel_group(registry, monkeypatch):
+    use_graph(registry, monkeypatch, ClauseGraph(
+        texts={"5.1": "", "9.1": "web", "10.1": "document", "11.1": "software", "6.1": "other"},
+        references={"5.1": ["10.1", "11.1", "6.1"]},
+        aliases={"10.1": "9.1", "11.1": "9.1"}
+    ))
+    
+    [references] = registry.expand_references([result("5.1")])
+    
+    assert [reference["clause"] for reference in references] == ["10.1", "6.1"]
+
+
+def test_variant_references_are_merged_into_representative():
+    docs = [
+        clause("9.1", "Where ICT is a web page, it shall satisfy clause 9.2 and the success criterion."),
+        clause("9.2", "Where ICT is a web page, it shall be operable with a keyboard."),
+        clause("9.3", "Where ICT is a web page, it shall provide captions."),
+        clause("10.1", "Where ICT is a document, it shall satisfy clause 10.3 and the success criterion."),
+        clause("10.2", "Where ICT is a document, it shall be operable with a keyboard."),
+        clause("10.3", "Where ICT is a document, it shall provide captions."),
+    ]
+    graph = ClauseGraph.from_documents(docs)
+    
+    aligned, graph.aliases = align_parallel_clauses(docs, ["9", "10"], threshold=0.5)
+    graph.merge_variant_references()
+    
+    assert [doc.metadata["clause_number"] for doc in aligned] == ["9.1", "9.2", "9.3"]
+    assert graph.aliases == {"10.1": "9.1", "10.2": "9.2", "10.3": "9.3"}
+    # 10.1 odwołuje się do 10.3 (wariant 9.3), czego reprezentant 9.1 nie robi
+    assert graph.references_of("9.1") == ["9.2", "10.3"]
+    assert expand_variants(aligned[0])[0]["page_content"] == docs[3].page_content
+
+
+def test_duplicate_variant_references_are_skipped():
+    graph = ClauseGraph(
+        texts={"9.1": "", "9.2": "", "10.1": "", "10.2": ""},
+        references={"9.1": ["9.2"], "10.1": ["10.2", "9.1"]},
+        aliases={"10.1": "9.1", "10.2": "9.2"}
+    )
+    
+    graph.merge_variant_references()
+    
+    assert graph.references_of("9.1") == ["9.2"]
@@ -0,0 +1,82 @@
+"""
+Testy magazynu rozmów SQLite i zapisu rozmowy przez chatbota.
+"""
+import os
+import threading
+
+import pytest
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from src.config.settings import Config
+from src.utils.conversation_store import ConversationStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ConversationStore(str(tmp_path / "conversations.db"))
+
+
+def test_turns_are_numbered_per_session(store):
+    assert [store.append("a", "user", str(i)) for i in range(3)] == [0, 1, 2]
+    assert store.append("b", "user", "x") == 0
+    assert store.count("a") == 3
+    assert store.count("b") == 1
+    assert store.count("missing") == 0
+
+
+def test_get_page_is_chronological(store):
+    for i in range(10):
+        store.append("s", "user" if i % 2 == 0 else "assistant", f"m{i}")
+    
+    assert [m["turn"] for m in store.get_page("s", 3)] == [7, 8, 9]
+    assert [m["content"] for m in store.get_page("s", 3, before_turn=7)] == ["m4", "m5", "m6"]
+    assert [m["turn"] for m in store.get_page("s", 5, before_turn=2)] == [0, 1]
+    assert store.get_page("s", 3, before_turn=0) == []
+    assert store.get_page("s", 2)[-1] == {"turn": 9, "role": "assistant", "content": "m9"}
+
+
+def test_concurrent_appends_never_repeat_turns(store):
+    turns = []
+    lock = threading.Lock()
+    
+    def worker(name: str) -> None:
+        for i in range(25):
+            turn = store.append("shared", "user", f"{name}-{i}")
+            with lock:
+                turns.append(turn)
+    
+    threads = [threading.Thread(target=worker, args=(f"t{n}",)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert sorted(turns) == list(range(200))
+    assert [m["turn"] for m in store.get_page("shared", 200)] == list(range(200))
+
+
+def test_process_message_uses_history_window(store):
+    normica_bot = pytest.importorskip("src.chatbot.normica_bot", exc_type=ImportError)
+    for i in range(Config.HISTORY_WINDOW + 6):
+        store.append("s", "user" if i % 2 == 0 else "assistant", f"m{i}")
+    before = store.count("s")
+    
+    class Agent:
+        def invoke(self, inputs):
+            self.inputs = inputs
+            return {"output": "odpowiedź"}
+    
+    chatbot = object.__new__(normica_bot.NormicaChatbot)
+    chatbot.conversation_store = store
+    chatbot.agent_executor = Agent()
+    
+    response = chatbot.process_message("s", "pytanie")
+    
+    history = chatbot.agent_executor.inputs["chat_history"]
+    assert [message.content for message in history] == [f"m{i}" for i in range(6, before)]
+    assert response == {"role": "assistant", "content": "odpowiedź"}
+    assert store.count("s") == before + 2
+    assert [(m["role"], m["content"]) for m in store.get_page("s", 2)] == [
+        ("user", "pytanie"), ("assistant", "odpowiedź")
+    ]
@@ -0,0 +1,62 @@
+"""
+Testy wyszukiwania w rejestrze korpusów z indeksem starszego wydania i brakującym shardem.
+"""
+import os
+
+import pytest
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from langchain_community.embeddings import FakeEmbeddings
+from langchain_community.vectorstores import FAISS
+
+from src.config.settings import Config
+from src.utils import corpus_registry, vector_store
+from src.utils.corpus_registry import CorpusRegistry
+from src.utils.vector_store import LEGACY_VERSION
+
+
+@pytest.fixture
+def embeddings(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "FAISS_INDEX_PATH", str(tmp_path / "faiss_index"))
+    return FakeEmbeddings(size=8)
+
+
+def test_legacy_index_is_published_and_searched(embeddings, monkeypatch):
+    FAISS.from_texts(["legacy text"], embeddings).save_local(Config.FAISS_INDEX_PATH)
+    registry = CorpusRegistry(embeddings)
+    started = []
+    monkeypatch.setattr(registry.rebuilder, "start", started.append)
+    
+    manager = registry.get_manager(Config.DEFAULT_CORPUS)
+    assert manager.current_version() == LEGACY_VERSION
+    assert manager.is_outdated()
+    # Indeks starszego wydania obsługuje zapytania, a nowa wersja powstaje w tle
+    assert registry.pending_corpora() == {}
+    assert started == [Config.DEFAULT_CORPUS]
+    [(doc, _score)] = registry.search("legacy")
+    assert doc.page_content == "legacy text"
+    assert doc.metadata["corpus"] == Config.DEFAULT_CORPUS
+
+
+def test_missing_shard_is_built_in_background(embeddings, monkeypatch):
+    registry = CorpusRegistry(embeddings)
+    started = []
+    monkeypatch.setattr(registry.rebuilder, "start", started.append)
+    
+    assert registry.search("query") == []
+    assert started == []
+    assert registry.pending_corpora() == {Config.DEFAULT_CORPUS: "building"}
+    assert started == [Config.DEFAULT_CORPUS]
+
+
+def test_sidebar_calls_need_no_api_client(embeddings, monkeypatch):
+    def missing_credentials():
+        raise AssertionError("klient API utworzony bez potrzeby")
+    
+    monkeypatch.setattr(corpus_registry, "create_embeddings", missing_credentials)
+    monkeypatch.setattr(vector_store, "create_embeddings", missing_credentials)
+    registry = CorpusRegistry()
+    
+    assert Config.DEFAULT_CORPUS in registry.available_corpora()
+    assert registry.rebuilder.status(Config.DEFAULT_CORPUS)["state"] == "idle"
@@ -0,0 +1,143 @@
+"""
+Testy harmonogramu zapytań na lokalnym serwerze HTTP udającym API OpenAI.
+"""
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from src.utils.request_scheduler import PRIORITY_BATCH, PRIORITY_INTERACTIVE, RequestScheduler
+
+
+class StubServer(ThreadingHTTPServer):
+    """Serwer zapisujący kolejność zapytań i połączenia; pierwsze `failures` zapytań dostaje 429."""
+    
+    def __init__(self, failures: int = 0):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.failures = failures
+        self.requests = []
+        self.connections = set()
+        self.lock = threading.Lock()
+    
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}/v1/embeddings"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    
+    def log_message(self, *args):
+        pass
+    
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with self.server.lock:
+            self.server.requests.append(body)
+            self.server.connections.add(self.client_address)
+            failing = len(self.server.requests) <= self.server.failures
+        
+        if failing:
+            payload = b'{"error": {"message": "rate limit", "type": "rate_limit"}}'
+            self.send_response(429)
+            self.send_header("retry-after", "0")
+        else:
+            payload = b'{"ok": true}'
+            self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+@pytest.fixture
+def server():
+    servers = []
+    
+    def start(failures: int = 0) -> StubServer:
+        stub = StubServer(failures)
+        threading.Thread(target=stub.serve_forever, daemon=True).start()
+        servers.append(stub)
+        return stub
+    
+    yield start
+    for stub in servers:
+        stub.shutdown()
+        stub.server_close()
+
+
+def make_scheduler(**kwargs) -> RequestScheduler:
+    options = dict(requests_per_minute=10_000, tokens_per_minute=10 ** 7, retry_base_delay=0.01)
+    options.update(kwargs)
+    return RequestScheduler(**options)
+
+
+def test_retries_after_429(server):
+    stub = server(failures=2)
+    scheduler = make_scheduler()
+    
+    response = scheduler.http_client.post(stub.url, json={"model": "m", "input": "a"})
+    
+    assert response.status_code == 200
+    assert len(stub.requests) == 3
+
+
+def test_gives_up_after_max_retries(server):
+    stub = server(failures=10)
+    scheduler = make_scheduler(max_retries=2)
+    
+    response = scheduler.http_client.post(stub.url, json={"model": "m", "input": "a"})
+    
+    assert response.status_code == 429
+    assert len(stub.requests) == 3
+
+
+def test_reuses_connection(server):
+    stub = server(failures=2)
+    scheduler = make_scheduler()
+    
+    for _ in range(5):
+        scheduler.http_client.post(stub.url, json={"model": "m", "input": "a"})
+    
+    assert len(stub.requests) == 7
+    assert len(stub.connections) == 1
+
+
+def test_interactive_before_batch(server):
+    stub = server()
+    # 120 zapytań na minutę: kolejne zapytanie co 0,5 s
+    scheduler = make_scheduler(requests_per_minute=120)
+    requests_bucket, _ = scheduler._buckets("m")
+    requests_bucket.level = 0
+    
+    def send(priority: int, name: str) -> None:
+        with RequestScheduler.priority(priority):
+            scheduler.http_client.post(stub.url, json={"model": "m", "input": name})
+    
+    batch = threading.Thread(target=send, args=(PRIORITY_BATCH, "batch"))
+    batch.start()
+    while not scheduler._waiting["m"]:
+        time.sleep(0.001)
+    interactive = threading.Thread(target=send, args=(PRIORITY_INTERACTIVE, "interactive"))
+    interactive.start()
+    batch.join()
+    interactive.join()
+    
+    assert [body["input"] for body in stub.requests] == ["interactive", "batch"]
+
+
+def test_rate_limit_headers_are_per_model():
+    scheduler = make_scheduler(tokens_per_minute=1000)
+    
+    class Response:
+        headers = {"x-ratelimit-remaining-tokens": "0"}
+    
+    scheduler.observe_response(Response(), "gpt-4o")
+    
+    assert scheduler._buckets("gpt-4o")[1].time_until(100) > 0
+    assert scheduler._buckets("text-embedding-ada-002")[1].time_until(100) == 0
@@ -0,0 +1,105 @@
+"""
+Testy publikowania wersji shardu indeksu (bez budowania embeddingów).
+"""
+import os
+import threading
+
+import pytest
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from langchain_community.embeddings import FakeEmbeddings
+
+from src.config.settings import Config
+from src.utils.clause_graph import ClauseGraph
+from src.utils.vector_store import (
+    CURRENT_VERSION_FILE,
+    TMP_PREFIX,
+    INDEX_FORMAT_FILE,
+    INDEX_FORMAT_VERSION,
+    IndexBuildInProgressError,
+    IndexNotReadyError,
+    VectorStoreManager
+)
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "FAISS_INDEX_PATH", str(tmp_path))
+    manager = VectorStoreManager(Config.DEFAULT_CORPUS, embeddings=object())
+    os.makedirs(manager.index_path)
+    return manager
+
+
+def publish(manager: VectorStoreManager, version: str) -> bool:
+    os.makedirs(os.path.join(manager.index_path, version))
+    return manager.activate_version(version)
+
+
+def test_missing_index_is_not_built_on_query(manager):
+    with pytest.raises(IndexNotReadyError):
+        manager.get_or_create_vector_store()
+    assert os.listdir(manager.index_path) == []
+
+
+def test_activate_refuses_older_version(manager):
+    assert publish(manager, "v20250102-000000-000000-bbbb")
+    assert not publish(manager, "v20250101-000000-000000-aaaa")
+    
+    assert manager.current_version() == "v20250102-000000-000000-bbbb"
+    with open(os.path.join(manager.index_path, CURRENT_VERSION_FILE), encoding="utf-8") as f:
+        assert f.read() == "v20250102-000000-000000-bbbb"
+
+
+def test_version_without_format_marker_is_outdated(manager):
+    publish(manager, "v20250101-000000-000000-aaaa")
+    assert manager.is_outdated()
+    
+    version_path = os.path.join(manager.index_path, "v20250102-000000-000000-bbbb")
+    os.makedirs(version_path)
+    with open(os.path.join(version_path, INDEX_FORMAT_FILE), "w", encoding="utf-8") as f:
+        f.write(str(INDEX_FORMAT_VERSION))
+    manager.activate_version("v20250102-000000-000000-bbbb")
+    assert not manager.is_outdated()
+
+
+def test_failed_save_leaves_no_tmp_directory(manager, tmp_path, monkeypatch):
+    source = tmp_path / "norm.md"
+    source.write_text("# 1 Scope\n\nText.\n", encoding="utf-8")
+    monkeypatch.setattr(manager, "source_path", str(source))
+    manager._embeddings = FakeEmbeddings(size=8)
+    stale_path = os.path.join(manager.index_path, f"{TMP_PREFIX}v20250101-000000-000000-aaaa")
+    os.makedirs(stale_path)
+    
+    def failing_save(directory):
+        os.makedirs(directory, exist_ok=True)
+        raise OSError("disk full")
+    
+    monkeypatch.setattr(ClauseGraph, "save", lambda self, directory: failing_save(directory))
+    with pytest.raises(OSError):
+        manager.build_new_version()
+    
+    assert os.listdir(manager.index_path) == []
+
+
+def test_only_one_build_per_corpus(manager, monkeypatch):
+    started = threading.Event()
+    release = threading.Event()
+    
+    def slow_build(report):
+        started.set()
+        release.wait(5)
+        return "v", None
+    
+    monkeypatch.setattr(manager, "_build_new_version", slow_build)
+    worker = threading.Thread(target=manager.build_new_version)
+    worker.start()
+    started.wait(5)
+    try:
+        assert manager.is_building()
+        with pytest.raises(IndexBuildInProgressError):
+            manager.build_new_version()
+    finally:
+        release.set()
+        worker.join()
+    assert not manager.is_building()